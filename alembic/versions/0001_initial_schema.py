@@ -0,0 +1,106 @@
+"""initial schema
+
+Revision ID: 0001
+Revises: 
+Create Date: 2026-10-18 09:00:00.000000
+
+Existing databases created before migrations were tracked can be marked
+as up to date with `alembic stamp 0001`.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'employees',
+        sa.Column('emp_id', sa.String(), nullable=False),
+        sa.Column('name', sa.String(), nullable=True),
+        sa.Column('age', sa.Integer(), nullable=True),
+        sa.Column('dept', sa.String(), nullable=True),
+        sa.Column('salary', sa.Float(), nullable=True),
+        sa.Column('password', sa.String(), nullable=True),
+        sa.Column('role', sa.String(), nullable=True),
+        sa.PrimaryKeyConstraint('emp_id'),
+    )
+    op.create_table(
+        'departments',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_departments_id', 'departments', ['id'])
+    op.create_index('ix_departments_name', 'departments', ['name'], unique=True)
+    op.create_table(
+        'attendance',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('emp_id', sa.String(), nullable=True),
+        sa.Column('date', sa.Date(), nullable=True),
+        sa.Column('status', sa.Enum('PRESENT', 'ABSENT', 'LEAVE', name='attendancestatus'), nullable=True),
+        sa.ForeignKeyConstraint(['emp_id'], ['employees.emp_id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_attendance_id', 'attendance', ['id'])
+    op.create_table(
+        'leaves',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('emp_id', sa.String(), nullable=True),
+        sa.Column('leave_date', sa.Date(), nullable=False),
+        sa.Column('reason', sa.String(), nullable=True),
+        sa.Column('status', sa.String(), nullable=True),
+        sa.Column('applied_at', sa.DateTime(), nullable=True),
+        sa.Column('approved_by', sa.String(), nullable=True),
+        sa.Column('approved_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['emp_id'], ['employees.emp_id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_table(
+        'notifications',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('emp_id', sa.String(), nullable=True),
+        sa.Column('message', sa.String(), nullable=False),
+        sa.Column('is_read', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['emp_id'], ['employees.emp_id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_notifications_id', 'notifications', ['id'])
+    op.create_table(
+        'office-echo',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('emp_id', sa.String(), nullable=False),
+        sa.Column('emp_name', sa.String(), nullable=False),
+        sa.Column('message', sa.String(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('edited_at', sa.DateTime(), nullable=True),
+        sa.Column('is_deleted', sa.Boolean(), nullable=True),
+        sa.ForeignKeyConstraint(['emp_id'], ['employees.emp_id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_office-echo_id', 'office-echo', ['id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_office-echo_id', table_name='office-echo')
+    op.drop_table('office-echo')
+    op.drop_index('ix_notifications_id', table_name='notifications')
+    op.drop_table('notifications')
+    op.drop_table('leaves')
+    op.drop_index('ix_attendance_id', table_name='attendance')
+    op.drop_table('attendance')
+    sa.Enum(name='attendancestatus').drop(op.get_bind(), checkfirst=True)
+    op.drop_index('ix_departments_name', table_name='departments')
+    op.drop_index('ix_departments_id', table_name='departments')
+    op.drop_table('departments')
+    op.drop_table('employees')
@@ -0,0 +1,45 @@
+"""per-day attendance ledger
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 09:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, Sequence[str], None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Before the ledger an employee had one row whose date was its creation
+    # time; keep only the latest row per (emp_id, date) so the key can be unique.
+    op.execute(
+        "DELETE FROM attendance WHERE id NOT IN ("
+        "SELECT MAX(id) FROM attendance GROUP BY emp_id, date)"
+    )
+    op.execute("DELETE FROM attendance WHERE emp_id IS NULL OR date IS NULL")
+    with op.batch_alter_table('attendance') as batch_op:
+        batch_op.alter_column('emp_id', existing_type=sa.String(), nullable=False)
+        batch_op.alter_column('date', existing_type=sa.Date(), nullable=False)
+        batch_op.create_unique_constraint('uq_attendance_emp_id_date', ['emp_id', 'date'])
+    op.create_index('ix_attendance_date', 'attendance', ['date'])
+    op.create_index('ix_leaves_leave_date_status', 'leaves', ['leave_date', 'status'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_leaves_leave_date_status', table_name='leaves')
+    op.drop_index('ix_attendance_date', table_name='attendance')
+    with op.batch_alter_table('attendance') as batch_op:
+        batch_op.drop_constraint('uq_attendance_emp_id_date', type_='unique')
+        batch_op.alter_column('date', existing_type=sa.Date(), nullable=True)
+        batch_op.alter_column('emp_id', existing_type=sa.String(), nullable=True)
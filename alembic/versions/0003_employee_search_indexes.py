@@ -0,0 +1,39 @@
+"""trigram indexes for employee search
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 09:20:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, Sequence[str], None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = ('name', 'emp_id', 'dept')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # On other databases these are plain B-tree indexes and search uses the
+    # in-process n-gram index instead.
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for column in COLUMNS:
+        op.create_index(
+            f'ix_employees_{column}_trgm', 'employees', [column],
+            postgresql_using='gin', postgresql_ops={column: 'gin_trgm_ops'},
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for column in COLUMNS:
+        op.drop_index(f'ix_employees_{column}_trgm', table_name='employees')
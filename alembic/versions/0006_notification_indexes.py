@@ -0,0 +1,30 @@
+"""notifications indexes for paging and unread counts
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, Sequence[str], None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_notifications_emp_id_is_read_created_at', 'notifications', ['emp_id', 'is_read', 'created_at'], unique=False)
+    op.create_index('ix_notifications_emp_id_created_at', 'notifications', ['emp_id', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_notifications_emp_id_created_at', table_name='notifications')
+    op.drop_index('ix_notifications_emp_id_is_read_created_at', table_name='notifications')
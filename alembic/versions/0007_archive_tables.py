@@ -0,0 +1,54 @@
+"""archive tables for notification and chat retention
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, Sequence[str], None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'notifications_archive',
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('emp_id', sa.String(), nullable=True),
+        sa.Column('message', sa.String(), nullable=False),
+        sa.Column('is_read', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('archived_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_notifications_archive_emp_id_id', 'notifications_archive', ['emp_id', 'id'], unique=False)
+    op.create_table(
+        'office-echo-archive',
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('emp_id', sa.String(), nullable=False),
+        sa.Column('emp_name', sa.String(), nullable=False),
+        sa.Column('message', sa.String(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('edited_at', sa.DateTime(), nullable=True),
+        sa.Column('is_deleted', sa.Boolean(), nullable=True),
+        sa.Column('archived_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_office_echo_archive_emp_id_id', 'office-echo-archive', ['emp_id', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_office_echo_archive_emp_id_id', table_name='office-echo-archive')
+    op.drop_table('office-echo-archive')
+    op.drop_index('ix_notifications_archive_emp_id_id', table_name='notifications_archive')
+    op.drop_table('notifications_archive')
@@ -0,0 +1,137 @@
+import csv
+import os
+import time
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Iterable, Iterator, TextIO
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+from .models import Attendance, AttendanceStatus, Department, Employee
+from .security import ROLES, PasswordHasher, password_hasher
+from .id_allocator import employee_numbers
+from .stats_cache import department_stats, employee_counts
+from .search import search_index
+from .response_cache import response_cache
+from . import crud
+
+BULK_IMPORT_BATCH_SIZE = int(os.getenv("BULK_IMPORT_BATCH_SIZE") or 500)
+
+
+@dataclass
+class ImportReport:
+    created: int = 0
+    skipped: int = 0
+    errors: list[str] = field(default_factory=list)
+    credentials: list[dict] = field(default_factory=list)
+    seconds: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.created / self.seconds if self.seconds else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "created": self.created,
+            "skipped": self.skipped,
+            "errors": self.errors,
+            "seconds": round(self.seconds, 3),
+            "rows_per_second": round(self.rows_per_second, 1),
+            "credentials": self.credentials,
+        }
+
+
+def read_csv_rows(stream: TextIO) -> Iterator[tuple[int, dict]]:
+    """(line number, row) pairs streamed from a CSV with name, age, dept, salary and optional role columns."""
+    reader = csv.DictReader(stream)
+    for row in reader:
+        yield reader.line_num, row
+
+
+def _parse(line: int, row: dict) -> dict:
+    try:
+        parsed = {
+            "name": row["name"].strip(),
+            "age": int(row["age"]),
+            "dept": row["dept"].strip().upper(),
+            "salary": float(row["salary"]),
+            "role": (row.get("role") or "employee").strip().lower(),
+        }
+    except (KeyError, AttributeError, ValueError) as e:
+        raise ValueError(f"line {line}: invalid row ({e})")
+    if parsed["role"] not in ROLES:
+        raise ValueError(f"line {line}: invalid role '{parsed['role']}' (expected one of {', '.join(ROLES)})")
+    return parsed
+
+
+def _import_batch(db: Session, batch: list[tuple[int, dict]], departments: set[str], report: ImportReport,
+                  hasher: PasswordHasher, create_departments: bool):
+    parsed = []
+    for line, row in batch:
+        try:
+            parsed.append(_parse(line, row))
+        except ValueError as e:
+            report.errors.append(str(e))
+
+    names = {row["name"] for row in parsed}
+    existing = set(db.scalars(select(Employee.name).where(Employee.name.in_(names)))) if names else set()
+    new_departments = []
+    rows = []
+    for row in parsed:
+        if row["name"] in existing:
+            report.skipped += 1
+            continue
+        if row["dept"] not in departments:
+            if not create_departments:
+                report.errors.append(f"{row['name']}: department '{row['dept']}' does not exist")
+                continue
+            departments.add(row["dept"])
+            new_departments.append(row["dept"])
+        existing.add(row["name"])
+        rows.append(row)
+
+    # Claim numbers before this session writes anything: the allocator commits on
+    # its own connection, which a pending write would block on SQLite.
+    passwords = [crud.generate_password() for _ in rows]
+    if rows:
+        hashes = hasher.hash_many(passwords)
+        numbers = employee_numbers.allocate_many(len(rows))
+        for row, number, hashed in zip(rows, numbers, hashes):
+            row["emp_id"] = crud.format_emp_id(row["name"], row["role"], number)
+            row["password"] = hashed
+    if new_departments:
+        db.execute(insert(Department), [{"name": name} for name in new_departments])
+    if rows:
+        db.execute(insert(Employee), rows)
+        db.execute(insert(Attendance), [{"emp_id": row["emp_id"], "status": AttendanceStatus.ABSENT} for row in rows])
+    db.commit()
+
+    for name in new_departments:
+        department_stats.department_added(name)
+    for row, password in zip(rows, passwords):
+        department_stats.employee_added(row["dept"], row["salary"])
+        employee_counts.employee_added(row["name"])
+        search_index.upsert(row["emp_id"], row["name"], row["dept"])
+        report.credentials.append({
+            "emp_id": row["emp_id"], "password": password, "name": row["name"],
+            "role": row["role"], "dept": row["dept"],
+        })
+    report.created += len(rows)
+    if rows or new_departments:
+        response_cache.bump("employees", "departments", "attendance")
+
+
+def bulk_import_employees(db: Session, rows: Iterable[tuple[int, dict]], batch_size: int = BULK_IMPORT_BATCH_SIZE,
+                          hasher: PasswordHasher = password_hasher, create_departments: bool = False) -> ImportReport:
+    """Import employees in batches: one name pre-check, one multi-row INSERT per table and one commit per batch.
+
+    Passwords are hashed in parallel on `hasher`'s pool. Rows whose name
+    already exists are skipped, as in the one-at-a-time seed.
+    """
+    report = ImportReport()
+    start = time.perf_counter()
+    departments = set(db.scalars(select(Department.name)))
+    rows = iter(rows)
+    while batch := list(islice(rows, max(1, batch_size))):
+        _import_batch(db, batch, departments, report, hasher, create_departments)
+    report.seconds = time.perf_counter() - start
+    return report
@@ -0,0 +1,250 @@
+import bisect
+import os
+import threading
+import time
+from collections import deque
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from .models import ChatMessage
+from .retention import CHAT_ARCHIVED_CHANNEL
+from .websocket.manager import manager
+
+# Most recent visible messages kept in memory (0 disables the buffer)
+CHAT_HISTORY_CACHE_SIZE = int(os.getenv("CHAT_HISTORY_CACHE_SIZE") or 500)
+CHAT_HISTORY_TTL_SECONDS = float(os.getenv("CHAT_HISTORY_TTL_SECONDS") or 300)
+# Chat events (new messages, edits, deletes) kept for reconnect replay
+CHAT_EVENT_LOG_SIZE = int(os.getenv("CHAT_EVENT_LOG_SIZE") or 2000)
+
+FIELDS = ("id", "emp_id", "emp_name", "message", "created_at", "edited_at", "is_deleted")
+
+
+class RecentMessages:
+    """Ring buffer of the newest non-deleted chat messages, ordered by id.
+
+    Kept current from the broker's "chat" (new message) and "chat_update"
+    (edit/delete) channels, so it sees every worker's writes, and reloaded
+    from the table every `ttl` seconds in case a broker message was missed.
+    It holds every visible message with id >= `_floor`; older pages go to
+    the database. Broadcasts keep being collected while the buffer is not
+    loaded, and a reload keeps the ones the table does not have yet (still
+    queued in a chat writer).
+    """
+
+    def __init__(self, size: int, ttl: float):
+        self.size = size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._ids: list[int] = []
+        self._rows: dict[int, dict] = {}
+        # Messages broadcast since the last reload
+        self._fresh: set[int] = set()
+        self._floor = 0
+        self._loaded_at: float | None = None
+        # Bumped by invalidate(); a reload that raced it is discarded
+        self._generation = 0
+        # Reloads in progress, and the updates they may have missed
+        self._reloads = 0
+        self._late_updates: list[dict] = []
+        self._lock = threading.Lock()
+
+    def _evict(self):
+        while len(self._ids) > self.size:
+            del self._rows[self._ids.pop(0)]
+            self._floor = self._ids[0]
+
+    def _end_reload(self):
+        self._reloads -= 1
+        if not self._reloads:
+            self._late_updates = []
+
+    def _ensure_loaded(self, db: Session):
+        while True:
+            with self._lock:
+                if self._loaded_at is not None and time.monotonic() - self._loaded_at <= self.ttl:
+                    return
+                generation = self._generation
+                self._reloads += 1
+            # Queried without the lock: add() and apply_update() take it on the event loop
+            try:
+                rows = db.scalars(
+                    select(ChatMessage)
+                    .where(ChatMessage.is_deleted == False)
+                    .order_by(ChatMessage.id.desc())
+                    .limit(self.size)
+                ).all()
+                loaded = {row.id: {field: getattr(row, field) for field in FIELDS} for row in rows}
+            except BaseException:
+                with self._lock:
+                    self._end_reload()
+                raise
+            with self._lock:
+                if generation != self._generation:
+                    self._end_reload()
+                    continue
+                # A short read means the table has nothing older to offer
+                floor = min(loaded) if len(rows) == self.size else 0
+                # Broadcast messages the table lacks are still queued in a chat writer
+                newest = max(loaded, default=0)
+                loaded.update(
+                    (message_id, row) for message_id, row in self._rows.items()
+                    if message_id not in loaded and message_id >= floor and (message_id > newest or message_id in self._fresh)
+                )
+                self._rows = loaded
+                self._ids = sorted(self._rows)
+                self._fresh = set()
+                self._floor = floor
+                # Edits and deletes that arrived while the query ran
+                for payload in self._late_updates:
+                    self._apply_update(payload)
+                self._end_reload()
+                self._evict()
+                self._loaded_at = time.monotonic()
+                return
+
+    def add(self, payload: dict):
+        with self._lock:
+            # Chat ids follow send order on every worker, so anything below the floor
+            # is older than the whole buffer and is served from the table
+            if payload["id"] < self._floor:
+                return
+            if payload["id"] not in self._rows:
+                bisect.insort(self._ids, payload["id"])
+            self._rows[payload["id"]] = {
+                field: payload.get(field) for field in FIELDS
+            } | {"is_deleted": False}
+            self._fresh.add(payload["id"])
+            self._evict()
+
+    def _apply_update(self, payload: dict):
+        row = self._rows.get(payload["id"])
+        if row is None:
+            return
+        if payload.get("is_deleted"):
+            del self._rows[payload["id"]]
+            self._ids.remove(payload["id"])
+        else:
+            row["message"] = payload["message"]
+            row["edited_at"] = payload["edited_at"]
+
+    def apply_update(self, payload: dict):
+        with self._lock:
+            self._apply_update(payload)
+            if self._reloads:
+                self._late_updates.append(payload)
+
+    def invalidate(self):
+        """Reload from the table on next use, dropping buffered messages too (e.g. after rows were deleted)."""
+        with self._lock:
+            self._loaded_at = None
+            self._generation += 1
+            self._rows = {}
+            self._ids = []
+            self._fresh = set()
+            self._floor = 0
+
+    def page(self, db: Session, limit: int, before_id: int | None) -> list[dict] | None:
+        """The `limit` newest visible messages below `before_id`, oldest first, or None if the buffer cannot tell."""
+        self._ensure_loaded(db)
+        with self._lock:
+            if self._loaded_at is None:
+                # Invalidated since the reload
+                self.misses += 1
+                return None
+            end = bisect.bisect_left(self._ids, before_id) if before_id else len(self._ids)
+            if end >= limit or self._floor == 0:
+                self.hits += 1
+                return [dict(self._rows[i]) for i in self._ids[max(0, end - limit):end]]
+            self.misses += 1
+            return None
+
+    def stats(self) -> dict:
+        return {"size": len(self._ids), "hits": self.hits, "misses": self.misses}
+
+
+class ChatEventLog:
+    """The last `size` chat events as this worker received them from the broker.
+
+    A reconnecting client names the newest message it has; everything logged
+    after that message is folded into one "sync" frame. Only touched from the
+    event loop, so it needs no lock.
+    """
+
+    def __init__(self, size: int):
+        self._events: deque[tuple[str, dict]] = deque(maxlen=max(1, size))
+        self.syncs = 0
+        self.resets = 0
+
+    def record_message(self, payload: dict):
+        self._events.append(("message", payload))
+
+    def record_update(self, payload: dict):
+        self._events.append(("update", payload))
+
+    def find_message(self, message_id: int) -> dict | None:
+        """The broadcast payload of `message_id` if it is still in the log."""
+        for kind, payload in reversed(self._events):
+            if kind == "message" and payload["id"] == message_id:
+                return payload
+        return None
+
+    def sync_frame(self, last_seen_id: int) -> dict:
+        """Messages, edits and deletions since `last_seen_id`; `reset` asks the client to reload history instead."""
+        events = list(self._events)
+        for start in range(len(events) - 1, -1, -1):
+            kind, payload = events[start]
+            if kind == "message" and payload["id"] == last_seen_id:
+                break
+        else:
+            self.resets += 1
+            return {"type": "sync", "reset": True}
+
+        messages: dict[int, dict] = {}
+        edits: dict[int, dict] = {}
+        deleted: set[int] = set()
+        for kind, payload in events[start + 1:]:
+            message_id = payload["id"]
+            if kind == "message":
+                messages[message_id] = payload
+            elif payload.get("is_deleted"):
+                messages.pop(message_id, None)
+                edits.pop(message_id, None)
+                deleted.add(message_id)
+            elif message_id in messages:
+                messages[message_id] = {**messages[message_id], "message": payload["message"], "edited_at": payload["edited_at"]}
+            else:
+                edits[message_id] = payload
+        self.syncs += 1
+        return {
+            "type": "sync",
+            "reset": False,
+            "messages": [messages[i] for i in sorted(messages)],
+            "edits": list(edits.values()),
+            "deleted": sorted(deleted),
+        }
+
+    def stats(self) -> dict:
+        return {"events": len(self._events), "syncs": self.syncs, "resets": self.resets}
+
+
+recent_messages = RecentMessages(CHAT_HISTORY_CACHE_SIZE, CHAT_HISTORY_TTL_SECONDS)
+manager.subscribe("chat", recent_messages.add)
+manager.subscribe("chat_update", recent_messages.apply_update)
+manager.subscribe(CHAT_ARCHIVED_CHANNEL, lambda payload: recent_messages.invalidate())
+
+chat_events = ChatEventLog(CHAT_EVENT_LOG_SIZE)
+manager.subscribe("chat", chat_events.record_message)
+manager.subscribe("chat_update", chat_events.record_update)
+
+
+def chat_history(db: Session, limit: int = 50, before_id: int | None = None):
+    """Visible messages, oldest first; the newest page(s) come from memory, older ones use the (is_deleted, id) index."""
+    if recent_messages.size > 0:
+        page = recent_messages.page(db, limit, before_id)
+        if page is not None:
+            return page
+    query = select(ChatMessage).where(ChatMessage.is_deleted == False)
+    if before_id:
+        query = query.where(ChatMessage.id < before_id)
+    messages = db.scalars(query.order_by(ChatMessage.id.desc()).limit(limit)).all()
+    return list(reversed(messages))
@@ -0,0 +1,261 @@
+import asyncio
+import contextvars
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import func, insert, select, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import IntegrityError
+from .database import async_engine
+from .id_allocator import IdAllocator
+from .models import ChatMessage
+
+# Flush when this many messages are queued, or this long after the first one
+CHAT_WRITE_BATCH_SIZE = int(os.getenv("CHAT_WRITE_BATCH_SIZE") or 500)
+CHAT_FLUSH_INTERVAL_MS = float(os.getenv("CHAT_FLUSH_INTERVAL_MS") or 5)
+# Senders wait for a flush once this many messages are waiting to be written
+CHAT_WRITE_MAX_PENDING = int(os.getenv("CHAT_WRITE_MAX_PENDING") or 20000)
+# A batch that still fails after this many attempts is dropped
+WRITE_ATTEMPTS = 5
+RETRY_DELAY_SECONDS = 0.5
+# Longest shutdown waits for queued messages to be written
+STOP_TIMEOUT_SECONDS = 10.0
+# How long after it was sent a broadcast message missing from the table may still be queued on another worker
+PENDING_WINDOW_SECONDS = STOP_TIMEOUT_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Moves the table's sequence past ids already in use (e.g. from before ids were drawn from it)
+_SYNC_SEQUENCE = text("""
+    SELECT setval(seq, high) FROM (
+        SELECT seq, GREATEST(
+            (SELECT COALESCE(MAX(id), 0) FROM "office-echo"),
+            (SELECT COALESCE(MAX(id), 0) FROM "office-echo-archive"),
+            (SELECT COALESCE(MAX(value), 0) FROM id_counters WHERE name = 'chat_message')
+        ) AS high
+        FROM (SELECT pg_get_serial_sequence('"office-echo"', 'id')::regclass AS seq) AS s
+    ) AS t
+    WHERE high > COALESCE(pg_sequence_last_value(seq), 0)
+""")
+_NEXT_IDS = text("""SELECT nextval(pg_get_serial_sequence('"office-echo"', 'id')) FROM generate_series(1, :count)""")
+# Serializes _SYNC_SEQUENCE across workers so it never moves the sequence back
+_SYNC_LOCK_KEY = 0x6368617469
+
+def _max_chat_message_id(conn: Connection) -> int:
+    return conn.execute(select(func.max(ChatMessage.id))).scalar() or 0
+
+
+class ChatIds:
+    """Chat message ids in one order across all workers.
+
+    On Postgres they come from the table's own sequence, elsewhere from the
+    "chat_message" row of id_counters, one number per message. Either way an
+    id is handed out when the message is sent, so history pages, reconnect
+    cursors and the in-memory buffers can all order messages by id. Sends
+    that arrive while a claim is in flight share the next round trip.
+    """
+
+    def __init__(self):
+        self.counter = IdAllocator("chat_message", 1, _max_chat_message_id)
+        self.claims = 0
+        self._waiting: list[asyncio.Future] = []
+        self._task: asyncio.Task | None = None
+        self._sequence_synced = False
+
+    async def allocate(self) -> int:
+        future = asyncio.get_running_loop().create_future()
+        self._waiting.append(future)
+        if self._task is None:
+            self._task = asyncio.create_task(self._serve(), context=contextvars.Context())
+        return await future
+
+    async def _serve(self):
+        try:
+            while self._waiting:
+                waiting, self._waiting = self._waiting, []
+                try:
+                    ids = await self._claim(len(waiting))
+                except Exception as e:
+                    for future in waiting:
+                        if not future.done():
+                            future.set_exception(e)
+                    continue
+                self.claims += 1
+                for future, message_id in zip(waiting, ids):
+                    if not future.done():
+                        future.set_result(message_id)
+        finally:
+            self._task = None
+
+    async def _claim(self, count: int) -> list[int]:
+        if async_engine.dialect.name != "postgresql":
+            # A short blocking transaction; keep it off the event loop
+            return await asyncio.to_thread(self.counter.allocate_many, count)
+        async with async_engine.connect() as conn:
+            if not self._sequence_synced:
+                await conn.execute(select(func.pg_advisory_xact_lock(_SYNC_LOCK_KEY)))
+                await conn.execute(_SYNC_SEQUENCE)
+                await conn.commit()
+                self._sequence_synced = True
+            return sorted((await conn.execute(_NEXT_IDS, {"count": count})).scalars())
+
+
+class ChatWriter:
+    """Write-behind queue for global chat messages.
+
+    `save` assigns the message id (see ChatIds) and returns at once, so it can
+    be broadcast before it is stored. A background task writes queued
+    messages with one multi-row INSERT per batch.
+    """
+
+    def __init__(self, batch_size: int = CHAT_WRITE_BATCH_SIZE, flush_interval_ms: float = CHAT_FLUSH_INTERVAL_MS,
+                 max_pending: int = CHAT_WRITE_MAX_PENDING):
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_pending = max(self.batch_size, max_pending)
+        self.ids = ChatIds()
+        self.written = 0
+        self.batches = 0
+        self.failed = 0
+        self.last_flush_ms = 0.0
+        self._pending: list[dict] = []
+        self._pending_ids: set[int] = set()
+        self._queued = 0   # messages ever queued
+        self._done = 0     # messages ever written or given up on
+        self._wakeup: asyncio.Event | None = None
+        self._progress: asyncio.Condition | None = None
+        self._task: asyncio.Task | None = None
+
+    def _ensure_started(self):
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._progress = asyncio.Condition()
+            # Fresh context: the writer outlives the request that starts it and must not count toward its queries
+            self._task = asyncio.create_task(self._run(), context=contextvars.Context())
+
+    async def save(self, emp_id: str, emp_name: str, message: str) -> ChatMessage:
+        """Queue a message and return it with its id and timestamp assigned; it is written within a few ms."""
+        self._ensure_started()
+        if len(self._pending) >= self.max_pending:
+            await self.flush()
+        row = {
+            "id": await self.ids.allocate(),
+            "emp_id": emp_id,
+            "emp_name": emp_name,
+            "message": message,
+            # UTC like the model defaults; retention compares against utcnow()
+            "created_at": datetime.utcnow(),
+            "is_deleted": False,
+        }
+        self._pending.append(row)
+        self._pending_ids.add(row["id"])
+        self._queued += 1
+        if len(self._pending) == 1 or len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+        return ChatMessage(**row, edited_at=None)
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            if len(self._pending) < self.batch_size:
+                # Give the batch a moment to fill; a full batch wakes us early
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+            while self._pending:
+                batch = self._pending[:self.batch_size]
+                del self._pending[:self.batch_size]
+                try:
+                    await self._write(batch)
+                except Exception:
+                    # Whatever went wrong, the task must survive and flush() waiters must be released
+                    self.failed += len(batch)
+                    logger.exception("Chat writer dropped %d messages", len(batch))
+                self._pending_ids.difference_update(row["id"] for row in batch)
+                self._done += len(batch)
+                async with self._progress:
+                    self._progress.notify_all()
+
+    async def _write(self, batch: list[dict]):
+        for attempt in range(1, WRITE_ATTEMPTS + 1):
+            start = time.perf_counter()
+            try:
+                async with async_engine.begin() as conn:
+                    await conn.execute(insert(ChatMessage), batch)
+            except IntegrityError:
+                # A bad row (e.g. its sender was deleted meanwhile) must not sink the rest
+                await self._write_one_by_one(batch)
+                return
+            except Exception as e:
+                if attempt == WRITE_ATTEMPTS:
+                    self.failed += len(batch)
+                    logger.error("Chat writer dropped %d messages after %d attempts: %r", len(batch), attempt, e)
+                    return
+                logger.warning("Chat writer flush failed, retrying: %r", e)
+                await asyncio.sleep(RETRY_DELAY_SECONDS)
+                continue
+            self.written += len(batch)
+            self.batches += 1
+            self.last_flush_ms = (time.perf_counter() - start) * 1000
+            return
+
+    async def _write_one_by_one(self, batch: list[dict]):
+        for row in batch:
+            try:
+                async with async_engine.begin() as conn:
+                    await conn.execute(insert(ChatMessage), row)
+                self.written += 1
+            except Exception as e:
+                self.failed += 1
+                logger.error("Chat message %s from %s dropped: %r", row["id"], row["emp_id"], getattr(e, "orig", e))
+
+    async def flush(self):
+        """Wait until every message queued so far has been written."""
+        if self._task is None:
+            return
+        target = self._queued
+        self._wakeup.set()
+        async with self._progress:
+            await self._progress.wait_for(lambda: self._done >= target or self._task.done())
+
+    async def wait_persisted(self, message_id: int):
+        """Wait for `message_id` to reach the table if it is still queued on this worker."""
+        if message_id in self._pending_ids:
+            await self.flush()
+
+    @staticmethod
+    def may_be_pending(created_at: datetime) -> bool:
+        """Whether a message sent at `created_at` could still be queued on another worker's writer."""
+        return datetime.utcnow() - created_at < timedelta(seconds=PENDING_WINDOW_SECONDS)
+
+    async def stop(self, timeout: float = STOP_TIMEOUT_SECONDS):
+        """Write everything still queued (for at most `timeout` seconds), then stop the background task."""
+        if self._task is None:
+            return
+        try:
+            await asyncio.wait_for(self.flush(), timeout)
+        except asyncio.TimeoutError:
+            logger.error("Chat writer stopped with %d messages unwritten", len(self._pending))
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._pending),
+            "id_claims": self.ids.claims,
+            "written": self.written,
+            "batches": self.batches,
+            "failed": self.failed,
+            "last_flush_ms": round(self.last_flush_ms, 3),
+        }
+
+
+chat_writer = ChatWriter()
@@ -1,28 +1,28 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func, Integer
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, insert, update, func, and_, or_
 from .models import Employee, Department, Attendance, AttendanceStatus, Leave, Notifications, ChatMessage
 from . import schemas
-from .security import get_password_hash
+from .security import password_hasher, token_cache
 from fastapi import HTTPException
 from .websocket.manager import manager
-import re, random, string
+from .database import dialect_insert
+from .id_allocator import employee_numbers
+from .stats_cache import department_stats, employee_counts
+from .search import search_index
+from .chat_writer import chat_writer
+from .chat_history import chat_events, recent_messages
+from .response_cache import response_cache
+import base64, binascii, random, string
 from datetime import date, datetime
 
-def generate_emp_id(db: Session, name: str, role: str = "employee"):
+def format_emp_id(name: str, role: str, number: int):
     name_upper = name.upper().replace(' ', '')
     prefix = "ADMIN" if role == "admin" else ""
-    last_emp = db.query(Employee).order_by(func.cast(func.right(Employee.emp_id, 3), Integer).desc()).first()
-    if last_emp:
-        emp_id_str = last_emp.emp_id
-        match = re.search(r'(\d+)$', emp_id_str)
-        if match:
-            last_number = int(match.group(1))
-            new_number = last_number + 1
-        else:
-            new_number = 1
-    else:
-        new_number = 1
-    return f"{prefix}{name_upper}{str(new_number).zfill(3)}"
+    return f"{prefix}{name_upper}{str(number).zfill(3)}"
+
+def generate_emp_id(name: str, role: str = "employee"):
+    return format_emp_id(name, role, employee_numbers.allocate())
 
 def generate_password(length=8):
     chars = string.ascii_letters + string.digits + "@#"
@@ -34,9 +34,9 @@ def create_employee(db: Session, data: schemas.EmployeeCreate):
     existing_dept = db.query(Department).filter(Department.name == dept_name).first()
     if not existing_dept:
         raise HTTPException(status_code=400, detail=f"Department '{dept_name}' does not exist.")
-    emp_id = generate_emp_id(db, data.name, role)
+    emp_id = generate_emp_id(data.name, role)
     password = generate_password()
-    hashed_password = get_password_hash(password)
+    hashed_password = password_hasher.hash_blocking(password)
 
     employee = Employee(
         emp_id=emp_id, name=data.name, age=data.age, dept=dept_name,
@@ -47,6 +47,10 @@ def create_employee(db: Session, data: schemas.EmployeeCreate):
     attendance = Attendance(emp_id=emp_id, status=AttendanceStatus.ABSENT)
     db.add(attendance)
     db.commit()
+    department_stats.employee_added(dept_name, data.salary)
+    employee_counts.employee_added(data.name)
+    search_index.upsert(emp_id, data.name, dept_name)
+    response_cache.bump("employees", "attendance")
     return {"emp_id": emp_id, "password": password}
 
 def get_all_employees(db: Session):
@@ -55,9 +59,14 @@ def get_all_employees(db: Session):
 def get_employee(db: Session, emp_id: str):
     return db.query(Employee).filter(Employee.emp_id == emp_id).first()
 
+async def get_employee_async(db: AsyncSession, emp_id: str):
+    result = await db.execute(select(Employee).where(Employee.emp_id == emp_id))
+    return result.scalars().first()
+
 def update_employee(db: Session, emp_id: str, data: schemas.EmployeeUpdate):
     employee = db.query(Employee).filter(Employee.emp_id == emp_id).first()
     if not employee: return None
+    old_name, old_dept, old_salary = employee.name, employee.dept, employee.salary
     if data.name: employee.name = data.name.upper()
     if data.age: employee.age = data.age
     if data.salary: employee.salary = data.salary
@@ -70,26 +79,68 @@ def update_employee(db: Session, emp_id: str, data: schemas.EmployeeUpdate):
         employee.role = data.role
     db.commit()
     db.refresh(employee)
+    department_stats.employee_changed(old_dept, old_salary, employee.dept, employee.salary)
+    employee_counts.employee_renamed(old_name, employee.name)
+    search_index.upsert(employee.emp_id, employee.name, employee.dept)
+    token_cache.invalidate(emp_id)
+    response_cache.bump("employees")
     return employee
 
 def delete_employee(db: Session, emp_id: str):
+    existing = db.query(Employee.name, Employee.dept, Employee.salary).filter(Employee.emp_id == emp_id).first()
     db.query(Attendance).filter(Attendance.emp_id == emp_id).delete()
     db.query(Leave).filter(Leave.emp_id == emp_id).delete()
     db.query(Notifications).filter(Notifications.emp_id == emp_id).delete()
     db.query(ChatMessage).filter(ChatMessage.emp_id == emp_id).delete()
     db.query(Employee).filter(Employee.emp_id == emp_id).delete()
     db.commit()
+    if existing:
+        department_stats.employee_removed(existing.dept, existing.salary)
+        employee_counts.employee_removed(existing.name)
+        search_index.remove(emp_id)
+        token_cache.invalidate(emp_id)
+        # Their chat messages are gone too; other workers catch up on their next reload
+        recent_messages.invalidate()
+        response_cache.bump("employees", "attendance", "leaves")
+
+def mark_attendance(db: Session, emp_id: str, status: AttendanceStatus, on_date: date | None = None):
+    on_date = on_date or date.today()
+    stmt = dialect_insert(db.get_bind())(Attendance).values(emp_id=emp_id, date=on_date, status=status)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Attendance.emp_id, Attendance.date],
+        set_={"status": stmt.excluded.status},
+    )
+    db.execute(stmt)
+    db.commit()
+    response_cache.bump("attendance")
+    return {"emp_id": emp_id, "date": on_date, "status": status}
 
-def mark_attendance(db: Session, emp_id: str, status: AttendanceStatus):
-    attendance = db.query(Attendance).filter(Attendance.emp_id == emp_id).first()
-    if attendance:
-        attendance.status = status
-    else:
-        attendance = Attendance(emp_id=emp_id, status=status)
-        db.add(attendance)
+def get_attendance(db: Session, emp_id: str, on_date: date):
+    return db.query(Attendance).filter(Attendance.emp_id == emp_id, Attendance.date == on_date).first()
 
-    db.commit()
-    return attendance
+def get_attendance_for_date(db: Session, on_date: date):
+    """Every employee's status on one day; employees without a row count as absent."""
+    rows = db.execute(
+        select(Employee.emp_id, Employee.name, Attendance.status)
+        .outerjoin(Attendance, and_(Attendance.emp_id == Employee.emp_id, Attendance.date == on_date))
+    )
+    on_leave = set(db.scalars(
+        select(Leave.emp_id).where(Leave.leave_date == on_date, Leave.status == "ACCEPTED")
+    ))
+    result = []
+    for emp_id, name, status in rows:
+        if emp_id in on_leave:
+            status = AttendanceStatus.LEAVE
+        result.append({"emp_id": emp_id, "name": name, "status": (status or AttendanceStatus.ABSENT).value})
+    return result
+
+def get_attendance_history(db: Session, emp_id: str, start: date, end: date):
+    return (
+        db.query(Attendance)
+        .filter(Attendance.emp_id == emp_id, Attendance.date >= start, Attendance.date <= end)
+        .order_by(Attendance.date)
+        .all()
+    )
 
 def list_departments(db: Session):
     return db.query(Department).all()
@@ -103,6 +154,8 @@ def create_department(db: Session, data: schemas.DepartmentCreate):
     db.add(dept)
     db.commit()
     db.refresh(dept)
+    department_stats.department_added(name)
+    response_cache.bump("departments")
     return dept
 
 def delete_department(db: Session, name: str):
@@ -112,29 +165,55 @@ def delete_department(db: Session, name: str):
         return False
     db.delete(dept)
     db.commit()
+    department_stats.department_removed(name)
+    response_cache.bump("departments")
     return True
 
-def get_limit_employees(skip: int, limit: int, name: str | None, db: Session):
+def encode_cursor(emp_id: str) -> str:
+    return base64.urlsafe_b64encode(emp_id.encode()).decode()
+
+def decode_cursor(cursor: str) -> str:
+    try:
+        return base64.b64decode(cursor.encode(), altchars=b"-_", validate=True).decode()
+    except (binascii.Error, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def get_limit_employees(skip: int, limit: int, name: str | None, db: Session, cursor: str | None = None):
+    """One page of employees ordered by emp_id.
+
+    With a cursor the page starts after the cursor's emp_id (keyset
+    pagination), otherwise `skip` rows are skipped. `next_cursor` is set
+    whenever another page exists.
+    """
     query = db.query(Employee)
     if name:
         query = query.filter(Employee.name.ilike(f"%{name}%"))
-    total = query.count()
-    list_employees = query.offset(skip).limit(limit).all()
-    return {"total": total, "list_of_employees": list_employees}
-
-async def apply_leave(db: Session, emp_id: str, data: schemas.LeaveCreate):
+    total = employee_counts.get(name, query.count)
+    query = query.order_by(Employee.emp_id)
+    if cursor:
+        query = query.filter(Employee.emp_id > decode_cursor(cursor))
+    else:
+        query = query.offset(skip)
+    list_employees = query.limit(limit + 1).all()
+    # One extra row tells whether another page exists; it is never returned
+    has_more = len(list_employees) > limit
+    list_employees = list_employees[:limit]
+    next_cursor = encode_cursor(list_employees[-1].emp_id) if has_more and list_employees else None
+    return {"total": total, "list_of_employees": list_employees, "next_cursor": next_cursor}
+
+async def apply_leave(db: AsyncSession, emp_id: str, data: schemas.LeaveCreate):
     if data.leave_date <= date.today():
         raise HTTPException(status_code=400, detail="Leave date cannot be in the past")
 
-    employee = db.query(Employee).filter(Employee.emp_id == emp_id).first()
+    employee = await get_employee_async(db, emp_id)
     if not employee:
         raise HTTPException(status_code=404, detail="Employee not found")
 
-    existing_leave = db.query(Leave).filter(
+    existing_leave = await db.execute(select(Leave.id).where(
         Leave.emp_id == emp_id,
         Leave.leave_date == data.leave_date
-    ).first()
-    if existing_leave:
+    ))
+    if existing_leave.first():
         raise HTTPException(status_code=400, detail="You have already applied for leave on this date")
 
     leave = Leave(
@@ -145,46 +224,38 @@ async def apply_leave(db: Session, emp_id: str, data: schemas.LeaveCreate):
         applied_at=datetime.utcnow()
     )
     db.add(leave)
-    db.flush()
-
-    admins = db.query(Employee).filter(Employee.role == "admin").all()
-
-    notifications: list[tuple[str, Notifications]] = []
-
-    for admin in admins:
-        notification = Notifications(
-            emp_id=admin.emp_id,
-            message=f"New leave request from {employee.name} for date {data.leave_date.strftime('%Y-%m-%d')}",
-            is_read=False
-        )
-        db.add(notification)
-        notifications.append((admin.emp_id, notification))
+    await db.flush()
+
+    message = f"New leave request from {employee.name} for date {data.leave_date.strftime('%Y-%m-%d')}"
+    admin_ids = (await db.execute(select(Employee.emp_id).where(Employee.role == "admin"))).scalars().all()
+    notifications = []
+    if admin_ids:
+        # One multi-row INSERT for all admins; RETURNING hands back the ids we push over WebSocket
+        notifications = (await db.execute(
+            insert(Notifications).returning(Notifications.id, Notifications.emp_id),
+            [{"emp_id": admin_id, "message": message, "is_read": False} for admin_id in admin_ids],
+        )).all()
+
+    await db.commit()
+    await db.refresh(leave)
+    response_cache.bump("leaves")
+
+    await manager.send_notifications([
+        (admin_emp_id, {
+            "type": "notification",
+            "id": notification_id,
+            "leave_id": leave.id,
+            "message": message,
+            "action": "new_leave_application"
+        })
+        for notification_id, admin_emp_id in notifications
+    ])
 
-    db.commit()
-    db.refresh(leave)
-    
-    # Refresh notifications to get their IDs
-    for admin_emp_id, notification in notifications:
-        db.refresh(notification)
-        try:
-            await manager.send_notification(
-                {
-                    "type": "notification",
-                    "id": notification.id,
-                    "leave_id": leave.id,
-                    "message": notification.message,
-                    "action": "new_leave_application"
-                },
-                admin_emp_id
-            )
-        except Exception as e:
-            print(f"WebSocket notification failed for admin {admin_emp_id}: {e}")
-    
     return leave
  
 
-async def leave_decision(db: Session, leave_id: int, data: schemas.LeaveDecision, admin_id: str):
-    leave = db.query(Leave).filter(Leave.id == leave_id).first()
+async def leave_decision(db: AsyncSession, leave_id: int, data: schemas.LeaveDecision, admin_id: str):
+    leave = (await db.execute(select(Leave).where(Leave.id == leave_id))).scalars().first()
     if not leave:
         raise HTTPException(status_code=404, detail="Leave not found or applied yet")
     
@@ -202,9 +273,10 @@ async def leave_decision(db: Session, leave_id: int, data: schemas.LeaveDecision
     )
     try:
         db.add(notification)
-        db.commit()
-        db.refresh(leave)
-        db.refresh(notification)
+        await db.commit()
+        response_cache.bump("leaves")
+        await db.refresh(leave)
+        await db.refresh(notification)
         
         # Send WebSocket notification
         await manager.send_notification({
@@ -216,7 +288,7 @@ async def leave_decision(db: Session, leave_id: int, data: schemas.LeaveDecision
         }, leave.emp_id)
         
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to process leave decision: {str(e)}")
     return leave
 
@@ -229,8 +301,39 @@ def list_all_leaves(db: Session):
 def get_pending_leaves_count(db: Session) -> int:
     return db.query(Leave).filter(Leave.status == "PENDING").count()
 
-def get_notifications(db : Session, emp_id : str):
-    return db.query(Notifications).filter(Notifications.emp_id == emp_id).order_by(Notifications.created_at.desc()).all()
+def encode_notification_cursor(created_at: datetime, id: int) -> str:
+    return encode_cursor(f"{created_at.isoformat()}|{id}")
+
+def decode_notification_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        created_at, id = decode_cursor(cursor).split("|")
+        return datetime.fromisoformat(created_at), int(id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def get_notifications(db : Session, emp_id : str, limit : int = 20, cursor : str | None = None, unread_only : bool = False):
+    """One newest-first page of an employee's notifications, keyset-paginated on (created_at, id)."""
+    query = select(Notifications).where(Notifications.emp_id == emp_id)
+    if unread_only:
+        query = query.where(Notifications.is_read == False)
+    if cursor:
+        created_at, id = decode_notification_cursor(cursor)
+        query = query.where(or_(
+            Notifications.created_at < created_at,
+            and_(Notifications.created_at == created_at, Notifications.id < id),
+        ))
+    rows = db.scalars(query.order_by(Notifications.created_at.desc(), Notifications.id.desc()).limit(limit + 1)).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_notification_cursor(rows[-1].created_at, rows[-1].id)
+    return {"notifications": rows, "next_cursor": next_cursor}
+
+def count_unread_notifications(db : Session, emp_id : str) -> int:
+    return db.scalar(
+        select(func.count()).select_from(Notifications)
+        .where(Notifications.emp_id == emp_id, Notifications.is_read == False)
+    )
 
 def read_notification(db : Session, id : int,current_user : str):
     notification = db.query(Notifications).filter(Notifications.id == id).first()
@@ -249,50 +352,56 @@ def delete_notification(id : int, db : Session, current_user : str):
     return {"message" : "Notification Deleted Successfully"}
 
 def mark_read_all_notifications(db : Session, current_user : str):
-    notifications = db.query(Notifications).filter(Notifications.emp_id == current_user).all()
-    if not notifications:
-        return "No Notifications Found"
-    for notification in notifications:
-        notification.is_read = True
+    return mark_read_notifications(db, current_user)
+
+def mark_read_notifications(db : Session, current_user : str, ids : list[int] | None = None):
+    """Mark the user's unread notifications (or just `ids`) read in one UPDATE; returns how many changed."""
+    stmt = update(Notifications).where(Notifications.emp_id == current_user, Notifications.is_read == False)
+    if ids is not None:
+        stmt = stmt.where(Notifications.id.in_(ids))
+    updated = db.execute(stmt.values(is_read=True).execution_options(synchronize_session=False)).rowcount
     db.commit()
-    return notifications
-
-def save_chat_message(db : Session,emp_id : str, emp_name : str, message : str):
-    chat_msg = ChatMessage(emp_id = emp_id, emp_name = emp_name, message = message, created_at = datetime.now())
-    
-    db.add(chat_msg)
-    db.commit()
-    db.refresh(chat_msg)
-    return chat_msg
-
-def chat_history(db : Session, limit : int = 50, before_id : int = None):
-    query = db.query(ChatMessage).filter(ChatMessage.is_deleted == False)
-    
-    if before_id:
-        query = query.filter(ChatMessage.id < before_id)
-    
-    messages = query.order_by(ChatMessage.created_at.desc()).limit(limit).all()
-    return list(reversed(messages))
-
-def update_chat_message(db : Session,message_id : int , emp_id :str, new_message : str):
-    chat_msg = db.query(ChatMessage).filter(ChatMessage.id == message_id, ChatMessage.emp_id == emp_id).first()
+    return {"updated": updated}
+
+async def save_chat_message(emp_id : str, emp_name : str, message : str):
+    # Write-behind: the id is assigned now, the row is stored with the next batch
+    return await chat_writer.save(emp_id, emp_name, message)
+
+def _chat_message_missing(message_id : int, emp_id : str) -> HTTPException:
+    # Broadcast but not in the table yet: it is still queued on the worker that accepted it
+    payload = chat_events.find_message(message_id)
+    if payload and payload["emp_id"] == emp_id and chat_writer.may_be_pending(datetime.fromisoformat(payload["created_at"])):
+        return HTTPException(status_code=503, detail="Message is still being saved, try again shortly", headers={"Retry-After": "1"})
+    return HTTPException(status_code=404, detail="Message not found or you don't own it")
+
+async def update_chat_message(db : AsyncSession,message_id : int , emp_id :str, new_message : str):
+    await chat_writer.wait_persisted(message_id)
+    chat_msg = (await db.execute(select(ChatMessage).where(ChatMessage.id == message_id, ChatMessage.emp_id == emp_id))).scalars().first()
     
     if not chat_msg:
-        raise HTTPException(status_code=404, detail="Message not found or you don't own it")
+        raise _chat_message_missing(message_id, emp_id)
     
     chat_msg.message = new_message
-    chat_msg.edited_at = datetime.now()
-    db.commit()
-    db.refresh(chat_msg)
+    chat_msg.edited_at = datetime.utcnow()
+    await db.commit()
+    await db.refresh(chat_msg)
+    await manager.publish("chat_update", {
+        "type": "chat_edit",
+        "id": chat_msg.id,
+        "message": chat_msg.message,
+        "edited_at": chat_msg.edited_at.isoformat(),
+        "is_deleted": False,
+    })
     return chat_msg
 
-def delete_message(db : Session, message_id : int , emp_id : str):
-    msg = db.query(ChatMessage).filter(ChatMessage.id == message_id, ChatMessage.emp_id == emp_id).first()
+async def delete_message(db : AsyncSession, message_id : int , emp_id : str):
+    await chat_writer.wait_persisted(message_id)
+    msg = (await db.execute(select(ChatMessage).where(ChatMessage.id == message_id, ChatMessage.emp_id == emp_id))).scalars().first()
     
     if not msg:
-        raise HTTPException(status_code=404, detail="Message not found or you don't own it")
+        raise _chat_message_missing(message_id, emp_id)
     
     msg.is_deleted = True
-    db.commit()
-    db.refresh(msg)
+    await db.commit()
+    await manager.publish("chat_update", {"type": "chat_delete", "id": msg.id, "is_deleted": True})
     return {"message" : "Message deleted Successfully" }
\ No newline at end of file
@@ -1,12 +1,209 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy import exc as sa_exc
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
 import os
+import logging
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
 from dotenv import load_dotenv
+from fastapi.requests import HTTPConnection
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-engine = create_engine(DATABASE_URL)
+# Async drivers for the sync URLs we are configured with
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+def to_async_url(url: str):
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for '{backend}' databases")
+    return url.set(drivername=ASYNC_DRIVERS[backend])
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or to_async_url(DATABASE_URL)
+# Optional read replica; GET/HEAD requests are served from it (see get_db)
+DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL")
+
+# Pool settings apply to each engine in each worker process
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE") or 5)
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW") or 10)
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT") or 30)
+# Replace connections older than this many seconds, ahead of server/proxy idle timeouts
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE") or 1800)
+# Test each connection on checkout so a restarted database doesn't surface as failed requests
+DB_POOL_PRE_PING = (os.getenv("DB_POOL_PRE_PING") or "true").lower() in ("1", "true", "yes")
+
+
+class PoolStatsMixin:
+    """Times every checkout so pool waits and saturation can be exported on /metrics."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.waiting = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.timeouts = 0
+
+    def _do_get(self):
+        with self._stats_lock:
+            self.waiting += 1
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except sa_exc.TimeoutError:
+            with self._stats_lock:
+                self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            with self._stats_lock:
+                self.waiting -= 1
+        with self._stats_lock:
+            self.checkouts += 1
+            self.wait_seconds += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+        return connection
+
+    def stats(self) -> dict:
+        checked_out = self.checkedout()
+        # max_overflow < 0 means no upper bound
+        capacity = self.size() + self._max_overflow if self._max_overflow >= 0 else 0
+        return {
+            "size": self.size(),
+            "max_overflow": self._max_overflow,
+            "checked_out": checked_out,
+            "idle": self.checkedin(),
+            "waiting": self.waiting,
+            "saturation": round(checked_out / capacity, 3) if capacity else 0.0,
+            "checkouts": self.checkouts,
+            "wait_seconds_total": round(self.wait_seconds, 6),
+            "wait_seconds_max": round(self.max_wait_seconds, 6),
+            "timeouts": self.timeouts,
+        }
+
+
+class InstrumentedQueuePool(PoolStatsMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(PoolStatsMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def pool_options(url, poolclass) -> dict:
+    url = make_url(url)
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        # In-memory SQLite lives in one connection; keep SQLAlchemy's default pool for it
+        return {}
+    return {
+        "poolclass": poolclass,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+engine = create_engine(DATABASE_URL, **pool_options(DATABASE_URL, InstrumentedQueuePool))
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **pool_options(ASYNC_DATABASE_URL, InstrumentedAsyncQueuePool))
+
+if DATABASE_REPLICA_URL:
+    ASYNC_DATABASE_REPLICA_URL = os.getenv("ASYNC_DATABASE_REPLICA_URL") or to_async_url(DATABASE_REPLICA_URL)
+    replica_engine = create_engine(DATABASE_REPLICA_URL, **pool_options(DATABASE_REPLICA_URL, InstrumentedQueuePool))
+    replica_async_engine = create_async_engine(ASYNC_DATABASE_REPLICA_URL, **pool_options(ASYNC_DATABASE_REPLICA_URL, InstrumentedAsyncQueuePool))
+else:
+    replica_engine, replica_async_engine = engine, async_engine
+
+
+def pool_stats() -> dict:
+    engines = {"primary": engine, "primary_async": async_engine.sync_engine}
+    if DATABASE_REPLICA_URL:
+        engines.update(replica=replica_engine, replica_async=replica_async_engine.sync_engine)
+    return {name: e.pool.stats() for name, e in engines.items() if isinstance(e.pool, PoolStatsMixin)}
+
+# Statements slower than this are logged with their parameters
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS") or 200)
+# The same statement run this many times in one request is reported as a likely N+1
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD") or 5)
+
+sql_logger = logging.getLogger("app.sql")
+
+
+class QueryStats:
+    """Queries issued on behalf of one request (sync and async engines alike)."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements: Counter[str] = Counter()
+
+    def repeated(self) -> list[tuple[str, int]]:
+        """Statement shapes run at least N_PLUS_ONE_THRESHOLD times, most frequent first."""
+        return [(sql, n) for sql, n in self.statements.most_common() if n >= N_PLUS_ONE_THRESHOLD]
+
+
+# Set by the request middleware; copied into threadpool workers along with the rest of the context
+current_query_stats: ContextVar[QueryStats | None] = ContextVar("current_query_stats", default=None)
+# Process-wide; updated from threadpool workers as well as the event loop, so only under _totals_lock
+query_totals = {"queries": 0, "seconds": 0.0, "slow_queries": 0}
+_totals_lock = threading.Lock()
+
+
+def query_totals_snapshot() -> dict:
+    with _totals_lock:
+        return dict(query_totals)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append((statement, time.perf_counter()))
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()[1]
+    slow = elapsed * 1000 >= SLOW_QUERY_MS
+    with _totals_lock:
+        query_totals["queries"] += 1
+        query_totals["seconds"] += elapsed
+        query_totals["slow_queries"] += slow
+    stats = current_query_stats.get()
+    if stats is not None:
+        stats.count += 1
+        stats.seconds += elapsed
+        stats.statements[statement] += 1
+    if slow:
+        sql_logger.warning("Slow query (%.1fms): %s | params: %.500r", elapsed * 1000, statement, parameters)
+
+
+def _handle_error(exception_context):
+    # A statement that raised never reaches after_cursor_execute; drop its start time
+    conn = exception_context.connection
+    starts = conn.info.get("query_start") if conn is not None else None
+    if starts and starts[-1][0] == exception_context.statement:
+        starts.pop()
+
+
+def instrument(sync_engine):
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _handle_error)
+
+instrument(engine)
+instrument(async_engine.sync_engine)
+if DATABASE_REPLICA_URL:
+    instrument(replica_engine)
+    instrument(replica_async_engine.sync_engine)
 
 SessionLocal = sessionmaker(
     autocommit=False,
@@ -14,11 +211,54 @@ SessionLocal = sessionmaker(
     bind=engine
 )
 
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    autoflush=False,
+    expire_on_commit=False,
+    class_=AsyncSession,
+)
+
+# Same as the primary sessions when no replica is configured
+ReplicaSessionLocal = sessionmaker(
+    autocommit=False,
+    autoflush=False,
+    bind=replica_engine
+)
+
+AsyncReplicaSessionLocal = async_sessionmaker(
+    bind=replica_async_engine,
+    autoflush=False,
+    expire_on_commit=False,
+    class_=AsyncSession,
+)
+
+# Methods whose handlers only read; these requests may see slightly stale replica data
+READ_ONLY_METHODS = {"GET", "HEAD"}
+
 Base = declarative_base()
 
-def get_db():
+def dialect_insert(bind):
+    """The bind's dialect-specific INSERT, which supports ON CONFLICT upserts."""
+    return postgresql.insert if bind.dialect.name == "postgresql" else sqlite.insert
+
+def uses_replica(connection: HTTPConnection) -> bool:
+    return connection.scope["type"] == "http" and connection.scope["method"] in READ_ONLY_METHODS
+
+def get_db(connection: HTTPConnection):
+    db = (ReplicaSessionLocal if uses_replica(connection) else SessionLocal)()
+    try:
+        yield db
+    finally:
+        db.close()
+
+def get_primary_db():
+    """A primary session even for GET, for handlers whose result is cached: a lagging replica's read would be kept."""
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db(connection: HTTPConnection):
+    async with (AsyncReplicaSessionLocal if uses_replica(connection) else AsyncSessionLocal)() as db:
+        yield db
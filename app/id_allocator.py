@@ -0,0 +1,89 @@
+import os
+import re
+import threading
+from typing import Callable
+from sqlalchemy import select, update
+from sqlalchemy.engine import Connection
+from .database import engine, dialect_insert
+from .models import Employee, IdCounter
+
+EMP_ID_BLOCK_SIZE = int(os.getenv("EMP_ID_BLOCK_SIZE") or 20)
+
+
+class IdAllocator:
+    """Hands out increasing numbers from blocks claimed in the id_counters table.
+
+    Each worker claims `block_size` numbers with one short UPDATE ... RETURNING
+    in its own transaction and serves them from memory, so allocation is O(1)
+    and never collides across workers. Numbers left in a block when a worker
+    exits are skipped, not reused.
+    """
+
+    def __init__(self, name: str, block_size: int, seed: Callable[[Connection], int]):
+        self.name = name
+        self.block_size = max(1, block_size)
+        self._seed = seed
+        self._next = 0
+        self._end = 0
+        self._lock = threading.Lock()
+
+    def _claim(self, size: int) -> int:
+        """Reserve `size` numbers and return the first one."""
+        claim = (
+            update(IdCounter)
+            .where(IdCounter.name == self.name)
+            .values(value=IdCounter.value + size)
+            .returning(IdCounter.value)
+        )
+        with engine.begin() as conn:
+            end = conn.execute(claim).scalar()
+            if end is None:
+                # First claim ever: start after the highest number already in use
+                conn.execute(
+                    dialect_insert(conn)(IdCounter)
+                    .values(name=self.name, value=self._seed(conn))
+                    .on_conflict_do_nothing(index_elements=[IdCounter.name])
+                )
+                end = conn.execute(claim).scalar()
+        return end - size + 1
+
+    @property
+    def available(self) -> int:
+        """Numbers left in the current block, i.e. how many `allocate` calls will not touch the database."""
+        return self._end - self._next
+
+    def allocate(self) -> int:
+        with self._lock:
+            if self._next >= self._end:
+                self._next = self._claim(self.block_size)
+                self._end = self._next + self.block_size
+            number = self._next
+            self._next += 1
+            return number
+
+    def allocate_many(self, count: int) -> list[int]:
+        """`count` numbers at once; claims one block large enough for all of them."""
+        with self._lock:
+            available = self._end - self._next
+            if available >= count:
+                start = self._next
+                self._next += count
+                return list(range(start, start + count))
+            size = max(count - available, self.block_size)
+            first = self._claim(size)
+            numbers = list(range(self._next, self._end)) + list(range(first, first + count - available))
+            self._next = first + count - available
+            self._end = first + size
+            return numbers
+
+
+def _max_employee_number(conn: Connection) -> int:
+    numbers = [
+        int(match.group(1))
+        for emp_id in conn.execute(select(Employee.emp_id)).scalars()
+        if (match := re.search(r"(\d+)$", emp_id))
+    ]
+    return max(numbers, default=0)
+
+
+employee_numbers = IdAllocator("employee", EMP_ID_BLOCK_SIZE, _max_employee_number)
@@ -1,14 +1,49 @@
 from dotenv import load_dotenv
 load_dotenv()
 
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from .routers import auth, admin, employee, notifications, global_chat
-from .middlewares.logging import LoggAndAuthMiddleware
+from .routers import auth, admin, employee, notifications, global_chat, metrics
+from .middlewares.logging import RequestMetricsMiddleware
 from .websocket import global_chat as ws_global_chat, ws_notifications
+from .database import async_engine, pool_stats, query_totals_snapshot, replica_async_engine
+from .security import password_hasher, token_cache
+from .websocket.manager import manager
+from .chat_writer import chat_writer
+from .retention import RETENTION_INTERVAL_SECONDS, run_retention_forever
+from .chat_history import recent_messages, chat_events
+from .metrics import register_collector
+from .response_cache import response_cache
 
-app = FastAPI()
-app.add_middleware(LoggAndAuthMiddleware)
+register_collector("password_hasher", password_hasher.stats)
+register_collector("token_cache", token_cache.stats)
+register_collector("websocket", manager.stats)
+register_collector("chat_writer", chat_writer.stats)
+register_collector("chat_history", recent_messages.stats)
+register_collector("chat_sync", chat_events.stats)
+register_collector("db", lambda: {**query_totals_snapshot(), "pool": pool_stats()})
+register_collector("response_cache", response_cache.stats)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await manager.start()
+    response_cache.start()
+    retention = asyncio.create_task(run_retention_forever()) if RETENTION_INTERVAL_SECONDS > 0 else None
+    yield
+    if retention is not None:
+        retention.cancel()
+    await manager.shutdown()
+    # Store queued chat messages before the engine goes away
+    await chat_writer.stop()
+    password_hasher.shutdown()
+    await async_engine.dispose()
+    if replica_async_engine is not async_engine:
+        await replica_async_engine.dispose()
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(RequestMetricsMiddleware)
 
 app.add_middleware(
     CORSMiddleware,
@@ -25,4 +60,5 @@ app.include_router(notifications.router)
 app.include_router(global_chat.router)
 app.include_router(ws_global_chat.router)
 app.include_router(ws_notifications.router)
+app.include_router(metrics.router)
 
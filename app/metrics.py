@@ -0,0 +1,137 @@
+import bisect
+import threading
+from typing import Callable
+
+# Request latency buckets in seconds (Prometheus `le` bounds)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels) -> str:
+    body = ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items())
+    return "{" + body + "}" if body else ""
+
+
+class Histogram:
+    """Cumulative-bucket histogram for one label set."""
+
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class HttpMetrics:
+    """Per-route request latency, status counts and in-flight requests, kept in memory.
+
+    Routes are labelled with their path template (e.g. /admin/employee/{emp_id})
+    so the number of series stays bounded. Database query counts and time are
+    accumulated per route as well, along with how often a route tripped the N+1
+    detector.
+    """
+
+    def __init__(self):
+        self.in_flight = 0
+        self._latency: dict[tuple[str, str], Histogram] = {}
+        self._status: dict[tuple[str, str, int], int] = {}
+        # (method, route) -> [queries, db seconds, N+1 requests]
+        self._db: dict[tuple[str, str], list] = {}
+        self._lock = threading.Lock()
+
+    def started(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def finished(self, method: str, route: str, status: int, seconds: float,
+                 queries: int = 0, db_seconds: float = 0.0, n_plus_one: bool = False):
+        with self._lock:
+            self.in_flight -= 1
+            histogram = self._latency.get((method, route))
+            if histogram is None:
+                histogram = self._latency[(method, route)] = Histogram()
+            histogram.observe(seconds)
+            key = (method, route, status)
+            self._status[key] = self._status.get(key, 0) + 1
+            db = self._db.get((method, route))
+            if db is None:
+                db = self._db[(method, route)] = [0, 0.0, 0]
+            db[0] += queries
+            db[1] += db_seconds
+            db[2] += n_plus_one
+
+    def render(self) -> list[str]:
+        with self._lock:
+            lines = [
+                "# HELP http_requests_in_flight Requests currently being served.",
+                "# TYPE http_requests_in_flight gauge",
+                f"http_requests_in_flight {self.in_flight}",
+                "# HELP http_requests_total Completed requests by route and status.",
+                "# TYPE http_requests_total counter",
+            ]
+            for (method, route, status), count in sorted(self._status.items()):
+                lines.append(f"http_requests_total{_labels(method=method, route=route, status=status)} {count}")
+            lines += [
+                "# HELP http_request_duration_seconds Request latency by route.",
+                "# TYPE http_request_duration_seconds histogram",
+            ]
+            for (method, route), histogram in sorted(self._latency.items()):
+                cumulative = 0
+                for bound, count in zip((*LATENCY_BUCKETS, "+Inf"), histogram.counts):
+                    cumulative += count
+                    lines.append(f"http_request_duration_seconds_bucket{_labels(method=method, route=route, le=bound)} {cumulative}")
+                lines.append(f"http_request_duration_seconds_sum{_labels(method=method, route=route)} {histogram.sum:.6f}")
+                lines.append(f"http_request_duration_seconds_count{_labels(method=method, route=route)} {histogram.count}")
+            db_series = sorted(self._db.items())
+            for name, index, help_text in (
+                ("http_request_db_queries_total", 0, "SQL statements executed while serving the route."),
+                ("http_request_db_seconds_total", 1, "Time spent in SQL statements while serving the route."),
+                ("http_request_n_plus_one_total", 2, "Requests that repeated one statement shape past N_PLUS_ONE_THRESHOLD."),
+            ):
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+                for (method, route), values in db_series:
+                    value = f"{values[index]:.6f}" if index == 1 else values[index]
+                    lines.append(f"{name}{_labels(method=method, route=route)} {value}")
+            return lines
+
+
+http_metrics = HttpMetrics()
+
+# name prefix -> function returning a (possibly nested) dict of numbers
+_collectors: dict[str, Callable[[], dict]] = {}
+
+
+def register_collector(prefix: str, collect: Callable[[], dict]):
+    """Export the numeric values of `collect()` as gauges named `<prefix>_<key>` on /metrics."""
+    _collectors[prefix] = collect
+
+
+def _flatten(prefix: str, values: dict):
+    for key, value in values.items():
+        name = f"{prefix}_{key}"
+        if isinstance(value, dict):
+            yield from _flatten(name, value)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield name, value
+
+
+def render_prometheus() -> str:
+    lines = http_metrics.render()
+    for prefix, collect in _collectors.items():
+        try:
+            values = collect()
+        except Exception as e:
+            lines.append(f"# collector {prefix} failed: {e!r}")
+            continue
+        for name, value in _flatten(prefix, values):
+            lines += [f"# TYPE {name} gauge", f"{name} {value}"]
+    return "\n".join(lines) + "\n"
@@ -1,20 +1,70 @@
+import os
+import random
 import time
 import logging
-from fastapi import Request
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from ..database import QueryStats, current_query_stats
+from ..metrics import http_metrics
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("app.middleware")
 
-class LoggAndAuthMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        start = time.time()
-        logger.info(f"Incoming request : {request.method} {request.url}")
-        # logger.info(f"request headers : {request.headers}") 
-        
-        response = await call_next(request)
-
-        duration = time.time() - start
-        logger.info(f"Complete request : {duration:.4f} seconds")
-        response.headers['X-Process-Time'] = str(duration)
-        return response
\ No newline at end of file
+# Share of requests logged (0..1); errors and slow requests are always logged
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE") or 1.0)
+SLOW_REQUEST_LOG_MS = float(os.getenv("SLOW_REQUEST_LOG_MS") or 1000)
+
+
+class RequestMetricsMiddleware:
+    """Pure ASGI timing middleware.
+
+    Records latency, status and in-flight counts per route template in
+    `http_metrics`, adds `Server-Timing` and `X-Process-Time` headers, and logs
+    one line for a sample of requests. SQL issued while serving the request is
+    counted through `current_query_stats` and reported in `X-DB-Query-Count`,
+    `X-DB-Time` (ms) and a `db` Server-Timing entry; statements repeated past
+    N_PLUS_ONE_THRESHOLD are logged as a likely N+1. WebSocket and lifespan
+    traffic passes straight through.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+        http_metrics.started()
+        # One mutable object shared with the threadpool copies of this context that run sync routes
+        queries = QueryStats()
+        token = current_query_stats.set(queries)
+
+        async def send_with_timing(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                elapsed = time.perf_counter() - start
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", f"app;dur={elapsed * 1000:.1f}, db;dur={queries.seconds * 1000:.1f}")
+                headers.append("X-Process-Time", f"{elapsed:.6f}")
+                headers.append("X-DB-Query-Count", str(queries.count))
+                headers.append("X-DB-Time", f"{queries.seconds * 1000:.1f}")
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_query_stats.reset(token)
+            elapsed = time.perf_counter() - start
+            # The router leaves the matched route in the scope; its template keeps label cardinality bounded
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            repeated = queries.repeated()
+            http_metrics.finished(scope["method"], route, status, elapsed, queries.count, queries.seconds, bool(repeated))
+            for statement, count in repeated:
+                logger.warning("Possible N+1 in %s %s: statement ran %d times: %s", scope["method"], route, count, statement)
+            if status >= 500 or elapsed * 1000 >= SLOW_REQUEST_LOG_MS or random.random() < LOG_SAMPLE_RATE:
+                logger.info("%s %s %d %.1fms %d queries %.1fms db", scope["method"], scope["path"], status,
+                            elapsed * 1000, queries.count, queries.seconds * 1000)
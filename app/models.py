@@ -1,7 +1,6 @@
-from sqlalchemy import Column, String, Integer, Float,Boolean, ForeignKey, Enum, Date, DateTime
-from sqlalchemy.sql import func
+from sqlalchemy import Column, String, Integer, Float,Boolean, ForeignKey, Enum, Date, DateTime, Index, UniqueConstraint
 import enum
-from datetime import datetime
+from datetime import date, datetime
 from .database import Base
 
 class AttendanceStatus(str, enum.Enum):
@@ -11,6 +10,10 @@ class AttendanceStatus(str, enum.Enum):
 
 class Employee(Base):
     __tablename__ = "employees"
+    __table_args__ = tuple(
+        Index(f"ix_employees_{column}_trgm", column, postgresql_using="gin", postgresql_ops={column: "gin_trgm_ops"})
+        for column in ("name", "emp_id", "dept")
+    )
 
     emp_id = Column(String, primary_key=True)
     name = Column(String)
@@ -30,14 +33,21 @@ class Department(Base):
 
 class Attendance(Base):
     __tablename__ = "attendance"
+    __table_args__ = (
+        UniqueConstraint("emp_id", "date", name="uq_attendance_emp_id_date"),
+        Index("ix_attendance_date", "date"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    emp_id = Column(String, ForeignKey("employees.emp_id"))
-    date = Column(Date, default=func.now())
+    emp_id = Column(String, ForeignKey("employees.emp_id"), nullable=False)
+    date = Column(Date, default=date.today, nullable=False)
     status = Column(Enum(AttendanceStatus), default=AttendanceStatus.ABSENT)
     
 class Leave(Base):
     __tablename__ = "leaves"
+    __table_args__ = (
+        Index("ix_leaves_leave_date_status", "leave_date", "status"),
+    )
 
     id = Column(Integer, primary_key=True)
     emp_id = Column(String, ForeignKey("employees.emp_id"))
@@ -50,6 +60,12 @@ class Leave(Base):
 
 class Notifications(Base):
     __tablename__ = "notifications"
+    __table_args__ = (
+        # Unread counts and unread-only pages
+        Index("ix_notifications_emp_id_is_read_created_at", "emp_id", "is_read", "created_at"),
+        # Newest-first pages of everything
+        Index("ix_notifications_emp_id_created_at", "emp_id", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True , index=True)
     emp_id = Column(String, ForeignKey("employees.emp_id"))
@@ -59,6 +75,10 @@ class Notifications(Base):
 
 class ChatMessage(Base):
     __tablename__ = "office-echo"
+    __table_args__ = (
+        # Keyset pages of visible messages: WHERE is_deleted = false AND id < :before ORDER BY id DESC
+        Index("ix_office_echo_is_deleted_id", "is_deleted", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     emp_id = Column(String,ForeignKey("employees.emp_id"), nullable=False)
@@ -66,4 +86,40 @@ class ChatMessage(Base):
     message = Column(String, nullable=False)
     created_at = Column(DateTime, default= datetime.utcnow)
     edited_at = Column(DateTime, nullable=True)
-    is_deleted = Column(Boolean, default=False)
\ No newline at end of file
+    is_deleted = Column(Boolean, default=False)
+
+class IdCounter(Base):
+    __tablename__ = "id_counters"
+
+    name = Column(String, primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
+
+
+# Rows moved out of the hot tables by app/retention.py; same columns plus archived_at
+class NotificationArchive(Base):
+    __tablename__ = "notifications_archive"
+    __table_args__ = (
+        Index("ix_notifications_archive_emp_id_id", "emp_id", "id"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    emp_id = Column(String)
+    message = Column(String, nullable=False)
+    is_read = Column(Boolean)
+    created_at = Column(DateTime)
+    archived_at = Column(DateTime, nullable=False)
+
+class ChatMessageArchive(Base):
+    __tablename__ = "office-echo-archive"
+    __table_args__ = (
+        Index("ix_office_echo_archive_emp_id_id", "emp_id", "id"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    emp_id = Column(String, nullable=False)
+    emp_name = Column(String, nullable=False)
+    message = Column(String, nullable=False)
+    created_at = Column(DateTime)
+    edited_at = Column(DateTime, nullable=True)
+    is_deleted = Column(Boolean)
+    archived_at = Column(DateTime, nullable=False)
@@ -0,0 +1,156 @@
+import asyncio
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Callable
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+from .stats_cache import department_stats, employee_counts
+from .websocket.manager import manager
+
+RESPONSE_CACHE = (os.getenv("RESPONSE_CACHE") or "true").lower() in ("1", "true", "yes")
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE") or 256)
+# Upper bound on staleness for writes that bypass crud (scripts, other services)
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS") or 60)
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=None)
+def _adapter(response_type) -> TypeAdapter:
+    return TypeAdapter(response_type)
+
+
+def _etag(body: bytes) -> str:
+    # Derived from the bytes, so every worker hands out the same tag for the same payload
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def _matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+@dataclass
+class CachedResponse:
+    versions: tuple[int, ...]
+    stored_at: float
+    body: bytes
+    etag: str
+
+
+class ResponseCache:
+    """Serialized GET responses with strong ETags, invalidated by version counters.
+
+    Each cached route names the topics it reads ("leaves", "employees", ...);
+    crud writes `bump` those topics, and the bump is relayed to the other
+    workers over the broker. A request whose entry is still current is
+    answered from memory, or with 304 when `If-None-Match` matches, without
+    opening a database connection.
+    """
+
+    def __init__(self, enabled: bool, maxsize: int, ttl: float):
+        self.enabled = enabled
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._versions: dict[str, int] = {}
+        self._entries: OrderedDict[tuple, CachedResponse] = OrderedDict()
+        self._lock = threading.Lock()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self.hits = 0
+        self.not_modified = 0
+        self.misses = 0
+
+    def start(self):
+        """Relay bumps to other workers from now on; call from the app's event loop."""
+        self._loop = asyncio.get_running_loop()
+
+    def bump(self, *topics: str):
+        """Mark everything cached under `topics` as changed, here and on every other worker."""
+        self._apply(topics)
+        if self._loop is not None and not self._loop.is_closed():
+            # crud writes run on threadpool workers as well as on the loop
+            future = asyncio.run_coroutine_threadsafe(
+                manager.publish("cache", {"worker": manager.worker_id, "topics": list(topics)}), self._loop
+            )
+            future.add_done_callback(_report_publish_failure)
+
+    def _apply(self, topics):
+        with self._lock:
+            for topic in topics:
+                self._versions[topic] = self._versions.get(topic, 0) + 1
+
+    def _on_bump(self, payload: dict):
+        if payload.get("worker") != manager.worker_id:
+            self._apply(payload["topics"])
+            # The in-process stats are only adjusted by this worker's own writes
+            if {"employees", "departments"} & set(payload["topics"]):
+                department_stats.invalidate()
+                employee_counts.invalidate()
+
+    def respond(self, request: Request, topics: tuple[str, ...], load: Callable[[], Any], response_type: Any = Any,
+                vary: tuple = ()) -> Response:
+        """Serve `load()` as JSON shaped by `response_type`, from the cache while `topics` are unchanged.
+
+        The key is the path, the query string and `vary` (e.g. today's date for a "today" default).
+        `load` should read from the primary (`get_primary_db`), or a lagging replica's data is stored.
+        """
+        key = (request.url.path, tuple(sorted(request.query_params.multi_items())), vary)
+        if_none_match = request.headers.get("if-none-match")
+        with self._lock:
+            versions = tuple(self._versions.get(topic, 0) for topic in topics)
+            entry = self._entries.get(key) if self.enabled else None
+            if entry is not None and entry.versions == versions and time.monotonic() - entry.stored_at <= self.ttl:
+                self._entries.move_to_end(key)
+                if _matches(if_none_match, entry.etag):
+                    self.not_modified += 1
+                    return self._not_modified(entry.etag)
+                self.hits += 1
+                return self._ok(entry.body, entry.etag)
+            self.misses += 1
+
+        adapter = _adapter(response_type)
+        body = adapter.dump_json(adapter.validate_python(load(), from_attributes=True))
+        etag = _etag(body)
+        if self.enabled:
+            with self._lock:
+                # Stored under the versions read before loading: a write that raced the load forces a reload next time
+                self._entries[key] = CachedResponse(versions, time.monotonic(), body, etag)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        if _matches(if_none_match, etag):
+            return self._not_modified(etag)
+        return self._ok(body, etag)
+
+    @staticmethod
+    def _headers(etag: str) -> dict:
+        # Behind auth, so private; no-cache makes clients revalidate every time
+        return {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+    def _ok(self, body: bytes, etag: str) -> Response:
+        return Response(content=body, media_type="application/json", headers=self._headers(etag))
+
+    def _not_modified(self, etag: str) -> Response:
+        return Response(status_code=304, headers=self._headers(etag))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._entries), "hits": self.hits, "not_modified": self.not_modified, "misses": self.misses}
+
+
+def _report_publish_failure(future):
+    if not future.cancelled() and future.exception() is not None:
+        logger.warning("Response cache bump not relayed: %r", future.exception())
+
+
+response_cache = ResponseCache(RESPONSE_CACHE, RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL_SECONDS)
+manager.subscribe("cache", response_cache._on_bump)
@@ -0,0 +1,169 @@
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Callable
+from sqlalchemy import and_, delete, func, insert, literal, or_, select
+from sqlalchemy.orm import Session
+from .database import SessionLocal
+from .models import ChatMessage, ChatMessageArchive, NotificationArchive, Notifications
+from .websocket.broker import create_broker
+
+# Age in days after which rows move to the archive tables; 0 keeps them forever
+RETENTION_READ_NOTIFICATION_DAYS = int(os.getenv("RETENTION_READ_NOTIFICATION_DAYS") or 90)
+RETENTION_DELETED_CHAT_DAYS = int(os.getenv("RETENTION_DELETED_CHAT_DAYS") or 7)
+RETENTION_CHAT_DAYS = int(os.getenv("RETENTION_CHAT_DAYS") or 0)
+# Rows moved per transaction; keeps each lock short
+RETENTION_BATCH_SIZE = int(os.getenv("RETENTION_BATCH_SIZE") or 1000)
+# How often each worker runs the job in the background; 0 leaves it to scripts/archive_old_rows.py
+RETENTION_INTERVAL_SECONDS = float(os.getenv("RETENTION_INTERVAL_SECONDS") or 0)
+# Broker channel telling every worker to reload its in-memory chat history after chat rows were archived
+CHAT_ARCHIVED_CHANNEL = "chat_archived"
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RetentionPolicy:
+    name: str
+    model: type
+    archive: type
+    # Builds the WHERE clause for rows due for archiving as of `now`, or None when nothing is
+    condition: Callable[[datetime], object | None]
+
+
+def _days_ago(now: datetime, days: int) -> datetime:
+    return now - timedelta(days=days)
+
+
+def _notification_condition(now: datetime):
+    if not RETENTION_READ_NOTIFICATION_DAYS:
+        return None
+    return and_(Notifications.is_read == True, Notifications.created_at < _days_ago(now, RETENTION_READ_NOTIFICATION_DAYS))
+
+
+def _chat_condition(now: datetime):
+    clauses = []
+    if RETENTION_DELETED_CHAT_DAYS:
+        clauses.append(and_(ChatMessage.is_deleted == True, ChatMessage.created_at < _days_ago(now, RETENTION_DELETED_CHAT_DAYS)))
+    if RETENTION_CHAT_DAYS:
+        clauses.append(ChatMessage.created_at < _days_ago(now, RETENTION_CHAT_DAYS))
+    return or_(*clauses) if clauses else None
+
+
+POLICIES = {
+    "notifications": RetentionPolicy("notifications", Notifications, NotificationArchive, _notification_condition),
+    "chat": RetentionPolicy("chat", ChatMessage, ChatMessageArchive, _chat_condition),
+}
+
+
+@dataclass
+class RetentionReport:
+    moved: dict[str, int] = field(default_factory=dict)
+    batches: int = 0
+    seconds: float = 0.0
+
+
+def count_due(db: Session, policy: RetentionPolicy, now: datetime | None = None) -> int:
+    condition = policy.condition(now or datetime.utcnow())
+    if condition is None:
+        return 0
+    return db.scalar(select(func.count()).select_from(policy.model).where(condition))
+
+
+def _archive_batch(db: Session, policy: RetentionPolicy, condition, batch_size: int, archived_at: datetime) -> int:
+    # SKIP LOCKED (Postgres) lets several workers run the job without waiting on each other
+    ids = db.scalars(
+        select(policy.model.id).where(condition)
+        .order_by(policy.model.id).limit(batch_size)
+        .with_for_update(skip_locked=True)
+    ).all()
+    if not ids:
+        db.rollback()
+        return 0
+    columns = [column.name for column in policy.model.__table__.columns]
+    db.execute(
+        insert(policy.archive).from_select(
+            columns + ["archived_at"],
+            select(*(policy.model.__table__.c[name] for name in columns), literal(archived_at))
+            .where(policy.model.id.in_(ids)),
+        )
+    )
+    db.execute(delete(policy.model).where(policy.model.id.in_(ids)))
+    db.commit()
+    return len(ids)
+
+
+def archive_old_rows(names: list[str] | None = None, batch_size: int = RETENTION_BATCH_SIZE) -> RetentionReport:
+    """Move every row due under the named policies (default: all) to its archive table, one short transaction per batch."""
+    report = RetentionReport()
+    start = time.perf_counter()
+    now = datetime.utcnow()
+    db = SessionLocal()
+    try:
+        for name in names or list(POLICIES):
+            policy = POLICIES[name]
+            condition = policy.condition(now)
+            report.moved[name] = 0
+            if condition is None:
+                continue
+            while True:
+                moved = _archive_batch(db, policy, condition, max(1, batch_size), now)
+                if not moved:
+                    break
+                report.moved[name] += moved
+                report.batches += 1
+    finally:
+        db.close()
+    report.seconds = time.perf_counter() - start
+    return report
+
+
+async def announce_chat_archived(moved: int):
+    """Publish CHAT_ARCHIVED_CHANNEL from outside the app (e.g. the CLI) on a broker connection of its own.
+
+    Only reaches other processes with a cross-worker broker; with WS_BROKER=memory
+    the workers pick the change up on their next chat history reload.
+    """
+    broker = create_broker(lambda channel, payload: None)
+    await broker.start()
+    try:
+        await broker.publish(CHAT_ARCHIVED_CHANNEL, {"moved": moved})
+    finally:
+        await broker.stop()
+
+
+async def run_retention_forever(interval: float = RETENTION_INTERVAL_SECONDS):
+    """Background loop for the app lifespan: archive, then sleep `interval` seconds."""
+    # Imported here: the WebSocket manager is not needed by the CLI
+    from .websocket.manager import manager
+    while True:
+        try:
+            report = await asyncio.to_thread(archive_old_rows)
+            if any(report.moved.values()):
+                logger.info("Retention archived %s in %.2fs", report.moved, report.seconds)
+            if report.moved.get("chat"):
+                await manager.publish(CHAT_ARCHIVED_CHANNEL, {"moved": report.moved["chat"]})
+        except Exception:
+            logger.exception("Retention job failed")
+        await asyncio.sleep(interval)
+
+
+def get_archived_notifications(db: Session, emp_id: str | None, limit: int, before_id: int | None):
+    query = select(NotificationArchive)
+    if emp_id:
+        query = query.where(NotificationArchive.emp_id == emp_id)
+    if before_id:
+        query = query.where(NotificationArchive.id < before_id)
+    return db.scalars(query.order_by(NotificationArchive.id.desc()).limit(limit)).all()
+
+
+def get_archived_chat_messages(db: Session, emp_id: str | None, limit: int, before_id: int | None):
+    query = select(ChatMessageArchive)
+    if emp_id:
+        query = query.where(ChatMessageArchive.emp_id == emp_id)
+    if before_id:
+        query = query.where(ChatMessageArchive.id < before_id)
+    return db.scalars(query.order_by(ChatMessageArchive.id.desc()).limit(limit)).all()
@@ -1,9 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, UploadFile
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from .. import models, schemas, crud
 from ..security import get_current_admin
-from ..database import get_db
+from ..database import get_db, get_async_db, get_primary_db
+from ..stats_cache import department_stats
+from ..response_cache import response_cache
+from ..search import search_employees
+from ..bulk_import import bulk_import_employees, read_csv_rows
+from ..retention import get_archived_chat_messages, get_archived_notifications
 from datetime import date
+import io
 
 router = APIRouter()
 
@@ -11,6 +18,13 @@ router = APIRouter()
 def add_employee(employee: schemas.EmployeeCreate, db: Session = Depends(get_db), current_user: str = Depends(get_current_admin)):
     return crud.create_employee(db, employee)
 
+@router.post("/admin/employees/bulk")
+def bulk_add_employees(file: UploadFile, create_departments: bool = False, db: Session = Depends(get_db), current_user: str = Depends(get_current_admin)):
+    """Import employees from a CSV upload (name, age, dept, salary, role) in batches."""
+    stream = io.TextIOWrapper(file.file, encoding="utf-8", newline="")
+    report = bulk_import_employees(db, read_csv_rows(stream), create_departments=create_departments)
+    return report.as_dict()
+
 @router.get("/admin/employee/{emp_id}", response_model=schemas.EmployeeOut)
 def get_employee(emp_id: str, db: Session = Depends(get_db), current_user: str = Depends(get_current_admin)):
     emp = crud.get_employee(db, emp_id)
@@ -24,31 +38,24 @@ def delete_employee(emp_id: str, db: Session = Depends(get_db), current_user: st
     return {"message": "Employee deleted"}
 
 @router.get("/admin/attendance")
-def admin_attendance(db: Session = Depends(get_db), current_user: str = Depends(get_current_admin)):
-    employees = db.query(models.Employee).all()
-    attendances = {att.emp_id: att.status for att in db.query(models.Attendance).all()}
-    today = date.today()
-    leaves = db.query(models.Leave).filter(models.Leave.status == "ACCEPTED", models.Leave.leave_date == today).all()
-    leave_emps = {leave.emp_id for leave in leaves}
-    result = []
-    for emp in employees:
-        if emp.emp_id in leave_emps:
-            status = models.AttendanceStatus.LEAVE
-        else:
-            status = attendances.get(emp.emp_id, models.AttendanceStatus.ABSENT)
-        result.append({"emp_id": emp.emp_id, "name": emp.name, "status": status.value})
-    return result
+def admin_attendance(request: Request, on_date: date | None = Query(None, alias="date"), db: Session = Depends(get_primary_db), current_user: str = Depends(get_current_admin)):
+    """Status of every employee on the given day (today by default)."""
+    on_date = on_date or date.today()
+    # Accepted leaves show up as LEAVE, so leave decisions change this page too
+    return response_cache.respond(request, ("attendance", "employees", "leaves"),
+                                  lambda: crud.get_attendance_for_date(db, on_date), vary=(on_date,))
+
+@router.get("/admin/attendance/{emp_id}/history", response_model=list[schemas.AttendanceOut])
+def attendance_history(emp_id: str, start: date, end: date | None = None, db: Session = Depends(get_db), current_user: str = Depends(get_current_admin)):
+    end = end or date.today()
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    return crud.get_attendance_history(db, emp_id, start, end)
 
 @router.put("/admin/attendance/{emp_id}")
 def update_attendance(emp_id: str, data: schemas.AttendanceUpdate, db: Session = Depends(get_db), current_user: str = Depends(get_current_admin)):
-    """Update or create attendance record for the given employee."""
-    record = db.query(models.Attendance).filter_by(emp_id=emp_id).first()
-    if record:
-        record.status = data.status
-    else:
-        record = models.Attendance(emp_id=emp_id, status=data.status)
-        db.add(record)
-    db.commit()
+    """Update or create the attendance record for the given employee and day (today by default)."""
+    crud.mark_attendance(db, emp_id, data.status, data.date)
     return {"message": "Attendance updated"}
 
 @router.patch("/admin/employee/{emp_id}")
@@ -59,23 +66,9 @@ def update_employee(emp_id: str, data: schemas.EmployeeUpdate, db: Session = Dep
     return {"message": "Employee updated successfully"}
 
 @router.get("/admin/departments")
-def get_departments(db: Session = Depends(get_db), current_user: str = Depends(get_current_admin)):
+def get_departments(request: Request, db: Session = Depends(get_primary_db), current_user: str = Depends(get_current_admin)):
     """Get department statistics from master list combined with employees."""
-    
-    departments = db.query(models.Department).all()
-    result = []
-    for dept in departments:
-        q = db.query(models.Employee).filter(models.Employee.dept == dept.name)
-        employee_count = q.count()
-        total_salary = sum(emp.salary for emp in q.all()) if employee_count > 0 else 0
-        average_salary = total_salary / employee_count if employee_count > 0 else 0
-        result.append({
-            "department": dept.name,
-            "employee_count": employee_count,
-            "total_salary": total_salary,
-            "average_salary": average_salary,
-        })
-    return result
+    return response_cache.respond(request, ("departments", "employees"), lambda: department_stats.get(db))
 
 @router.post("/admin/departments")
 def add_department(data: schemas.DepartmentCreate, db: Session = Depends(get_db), current_user: str = Depends(get_current_admin)):
@@ -96,22 +89,32 @@ def remove_department(name: str, db: Session = Depends(get_db), current_user: st
     return {"message": "Department deleted successfully"}
 
 @router.get("/admin/employees", response_model=schemas.EmployeeListResponse)
-def list_employees(skip: int = 0, limit: int = 10, name: str | None = None, db: Session = Depends(get_db), current_user: str = Depends(get_current_admin)):
-    return crud.get_limit_employees(skip, limit, name, db)
+def list_employees(skip: int = 0, limit: int = 10, name: str | None = None, cursor: str | None = None, db: Session = Depends(get_db), current_user: str = Depends(get_current_admin)):
+    return crud.get_limit_employees(skip, limit, name, db, cursor)
+
+@router.get("/admin/employees/search", response_model=list[schemas.EmployeeOut])
+def search_employee_list(q: str, limit: int = Query(20, ge=1, le=100), db: Session = Depends(get_db), current_user: str = Depends(get_current_admin)):
+    """Search-as-you-type over name, emp_id and dept (prefix, substring and fuzzy matches)."""
+    return search_employees(db, q, limit)
 
 @router.patch("/admin/leave/{leave_id}")
-async def update_leave_status(leave_id : int, decision : schemas.LeaveDecision, db : Session = Depends(get_db), current_user : str = Depends(get_current_admin)):
-    emp = crud.get_employee(db, current_user)
-    if not emp or emp.role != "admin":
-        raise HTTPException(status_code=403, detail="Not authorized")
+async def update_leave_status(leave_id : int, decision : schemas.LeaveDecision, db : AsyncSession = Depends(get_async_db), current_user : str = Depends(get_current_admin)):
     return await crud.leave_decision(db, leave_id, decision, current_user)
 
 @router.get("/admin/leaves", response_model=list[schemas.LeaveOut])
-def list_leaves(db: Session = Depends(get_db), current_user: str = Depends(get_current_admin)):
-    return crud.list_all_leaves(db)
+def list_leaves(request: Request, db: Session = Depends(get_primary_db), current_user: str = Depends(get_current_admin)):
+    return response_cache.respond(request, ("leaves",), lambda: crud.list_all_leaves(db), list[schemas.LeaveOut])
 
 @router.get("/admin/leaves/pending-count")
-def get_pending_leaves_count(db: Session = Depends(get_db), current_user: str = Depends(get_current_admin)):
-    count = crud.get_pending_leaves_count(db)
-    return {"pending_leaves": count}
+def get_pending_leaves_count(request: Request, db: Session = Depends(get_primary_db), current_user: str = Depends(get_current_admin)):
+    return response_cache.respond(request, ("leaves",), lambda: {"pending_leaves": crud.get_pending_leaves_count(db)})
+
+@router.get("/admin/archive/notifications", response_model=list[schemas.ArchivedNotificationOut])
+def list_archived_notifications(emp_id: str | None = None, limit: int = Query(50, ge=1, le=500), before_id: int | None = None, db: Session = Depends(get_db), current_user: str = Depends(get_current_admin)):
+    """Notifications moved out by the retention job, newest first."""
+    return get_archived_notifications(db, emp_id, limit, before_id)
 
+@router.get("/admin/archive/chat", response_model=list[schemas.ArchivedChatMessageOut])
+def list_archived_chat_messages(emp_id: str | None = None, limit: int = Query(50, ge=1, le=500), before_id: int | None = None, db: Session = Depends(get_db), current_user: str = Depends(get_current_admin)):
+    """Chat messages moved out by the retention job, newest first."""
+    return get_archived_chat_messages(db, emp_id, limit, before_id)
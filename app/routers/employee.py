@@ -1,10 +1,12 @@
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
-from .. import models, crud, schemas
-from ..database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from .. import crud, schemas
+from ..database import get_db, get_async_db
 
-from ..security import get_current_user
+from ..security import get_current_user, get_current_employee, TokenClaims
 from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import date
 
 router = APIRouter()
 
@@ -18,8 +20,7 @@ def employee_attendance(emp_id: str, db: Session = Depends(get_db), current_user
     if emp_id != current_user:
          raise HTTPException(status_code=403, detail="Not authorized to view this attendance")
     
-    record = db.query(models.Attendance).filter_by(emp_id=emp_id).first()
-    return record
+    return crud.get_attendance(db, emp_id, date.today())
 
 @router.get("/employee/profile/{emp_id}")
 def employee_profile(emp_id: str, db: Session = Depends(get_db), current_user: str = Depends(get_current_user)):
@@ -32,16 +33,10 @@ def employee_profile(emp_id: str, db: Session = Depends(get_db), current_user: s
     return emp
 
 @router.post("/employee/leave", response_model=schemas.LeaveOut)
-async def employee_apply_leave(leave: schemas.LeaveCreate, db: Session = Depends(get_db), current_user: str = Depends(get_current_user)):
-    emp = crud.get_employee(db, current_user)
-    if not emp or emp.role != "employee":
-        raise HTTPException(status_code=403, detail="Not authorized")
-    return await crud.apply_leave(db, current_user, leave)
+async def employee_apply_leave(leave: schemas.LeaveCreate, db: AsyncSession = Depends(get_async_db), claims: TokenClaims = Depends(get_current_employee)):
+    return await crud.apply_leave(db, claims.emp_id, leave)
 
 @router.get("/employee/leave", response_model=list[schemas.LeaveOut])
-def employee_get_leave(db : Session = Depends(get_db),current_user = Depends(get_current_user)):
-    emp = crud.get_employee(db, current_user)
-    if not emp or emp.role != "employee":
-        raise HTTPException(status_code=403, detail="Not authorized")
-    return crud.get_leaves_status(db,current_user)
+def employee_get_leave(db : Session = Depends(get_db),claims: TokenClaims = Depends(get_current_employee)):
+    return crud.get_leaves_status(db,claims.emp_id)
 
@@ -0,0 +1,17 @@
+import os
+import secrets
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+from ..metrics import render_prometheus
+
+router = APIRouter()
+
+# When set, scrapers must send "Authorization: Bearer <METRICS_TOKEN>"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def metrics(authorization: str | None = Header(None)):
+    """Prometheus text exposition of request metrics and internal pool/queue/cache stats."""
+    if METRICS_TOKEN and not secrets.compare_digest(authorization or "", f"Bearer {METRICS_TOKEN}"):
+        raise HTTPException(status_code=401, detail="Not authorized")
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
 from .. import models, crud, schemas
 from ..database import get_db
@@ -6,15 +6,24 @@ from ..security import get_current_user
 
 router = APIRouter()
 
-@router.get("/notifications", response_model=list[schemas.NotificationOut])
-def employee_get_Notifications(db:Session = Depends(get_db), current_user : str = Depends(get_current_user)):
-    return crud.get_notifications(db, current_user)
+@router.get("/notifications", response_model=schemas.NotificationListResponse)
+def employee_get_Notifications(limit: int = Query(20, ge=1, le=100), cursor: str | None = None, unread_only: bool = False,
+                               db:Session = Depends(get_db), current_user : str = Depends(get_current_user)):
+    return crud.get_notifications(db, current_user, limit, cursor, unread_only)
+
+@router.get("/notifications/unread-count")
+def unread_notifications_count(db:Session = Depends(get_db), current_user : str = Depends(get_current_user)):
+    return {"unread_notifications": crud.count_unread_notifications(db, current_user)}
+
+@router.patch("/notifications/read")
+def read_many_notifications(data : schemas.NotificationReadMany, db:Session = Depends(get_db), current_user : str = Depends(get_current_user)):
+    return crud.mark_read_notifications(db, current_user, data.ids)
 
 @router.patch("/notifications/{id}/read", response_model=schemas.NotificationOut)
 def read_notification(id : int,db:Session= Depends(get_db), current_user : str = Depends(get_current_user)):
     return crud.read_notification(db, id, current_user)
 
-@router.patch("/notifications", response_model=list[schemas.NotificationOut])
+@router.patch("/notifications")
 def mark_read_all_notifications(db : Session = Depends(get_db), current_user : str = Depends(get_current_user)):
     return crud.mark_read_all_notifications(db,current_user)
 
@@ -1,6 +1,7 @@
 from pydantic import BaseModel
 from .models import AttendanceStatus
 from datetime import date, datetime
+import datetime as dt
 from typing import Optional, List, Literal
 
 class EmployeeCreate(BaseModel):
@@ -24,7 +25,15 @@ class EmployeeLogin(BaseModel):
 
 class AttendanceUpdate(BaseModel):
     status: AttendanceStatus
-    date : date = None 
+    date : Optional[dt.date] = None 
+
+class AttendanceOut(BaseModel):
+    emp_id: str
+    date: dt.date
+    status: AttendanceStatus
+
+    class Config:
+        from_attributes = True
 
 
 class EmployeeUpdate(BaseModel):
@@ -46,6 +55,7 @@ class Token(BaseModel):
 class EmployeeListResponse(BaseModel):
     total: int
     list_of_employees: List[EmployeeOut]
+    next_cursor: Optional[str] = None
 
 class LeaveCreate(BaseModel):
     leave_date: date
@@ -75,9 +85,44 @@ class NotificationOut(BaseModel):
     class Config:
         from_attributes = True
 
+class NotificationListResponse(BaseModel):
+    notifications: List[NotificationOut]
+    next_cursor: Optional[str] = None
+
+class NotificationReadMany(BaseModel):
+    ids: List[int]
+
+class ArchivedNotificationOut(BaseModel):
+    id: int
+    emp_id: Optional[str]
+    message: str
+    is_read: Optional[bool]
+    created_at: Optional[datetime]
+    archived_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class ArchivedChatMessageOut(BaseModel):
+    id : int
+    emp_id : str
+    emp_name : str
+    message : str
+    created_at : Optional[datetime]
+    edited_at : Optional[datetime]
+    is_deleted : Optional[bool]
+    archived_at : datetime
+
+    class Config:
+        from_attributes = True
+
 class chatMessageIn(BaseModel):
     message : str
     
+class OnlineEmployeeOut(BaseModel):
+    emp_id : str
+    emp_name : str
+
 class chatMessageOut(BaseModel):
     id : int
     emp_id : str
@@ -0,0 +1,153 @@
+import bisect
+import os
+import threading
+import time
+from collections import Counter
+from sqlalchemy import case, func, or_, select
+from sqlalchemy.orm import Session
+from .models import Employee
+
+SEARCH_INDEX_TTL_SECONDS = float(os.getenv("SEARCH_INDEX_TTL_SECONDS") or 300)
+# Share of the query's trigrams a fuzzy match must contain
+FUZZY_MIN_SCORE = 0.4
+NGRAM = 3
+
+
+def _ngrams(text: str) -> set[str]:
+    return {text[i:i + NGRAM] for i in range(len(text) - NGRAM + 1)}
+
+
+class NgramIndex:
+    """In-process trigram index over employee name, emp_id and dept.
+
+    Used where pg_trgm is not available (SQLite). Kept current by the
+    employee crud writes and rebuilt from the table every `ttl` seconds.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._docs: dict[str, tuple[str, ...]] = {}
+        self._postings: dict[str, set[str]] = {}
+        self._sorted: list[tuple[str, str]] = []
+        self._loaded_at: float | None = None
+        self._lock = threading.Lock()
+
+    def _add(self, emp_id: str, fields: tuple[str, ...]):
+        self._docs[emp_id] = fields
+        for field in fields:
+            for gram in _ngrams(field):
+                self._postings.setdefault(gram, set()).add(emp_id)
+            bisect.insort(self._sorted, (field, emp_id))
+
+    def _remove(self, emp_id: str):
+        fields = self._docs.pop(emp_id, None)
+        if fields is None:
+            return
+        for field in fields:
+            for gram in _ngrams(field):
+                postings = self._postings.get(gram)
+                if postings is not None:
+                    postings.discard(emp_id)
+                    if not postings:
+                        del self._postings[gram]
+            i = bisect.bisect_left(self._sorted, (field, emp_id))
+            if i < len(self._sorted) and self._sorted[i] == (field, emp_id):
+                del self._sorted[i]
+
+    @staticmethod
+    def _fields(emp_id: str, name: str | None, dept: str | None) -> tuple[str, ...]:
+        return tuple(f.lower() for f in (name or "", emp_id, dept or ""))
+
+    def _ensure_loaded(self, db: Session):
+        if self._loaded_at is not None and time.monotonic() - self._loaded_at <= self.ttl:
+            return
+        self._docs.clear()
+        self._postings.clear()
+        self._sorted.clear()
+        for emp_id, name, dept in db.execute(select(Employee.emp_id, Employee.name, Employee.dept)):
+            self._add(emp_id, self._fields(emp_id, name, dept))
+        self._loaded_at = time.monotonic()
+
+    def upsert(self, emp_id: str, name: str | None, dept: str | None):
+        with self._lock:
+            if self._loaded_at is None:
+                return
+            self._remove(emp_id)
+            self._add(emp_id, self._fields(emp_id, name, dept))
+
+    def remove(self, emp_id: str):
+        with self._lock:
+            if self._loaded_at is not None:
+                self._remove(emp_id)
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = None
+
+    def search(self, db: Session, q: str, limit: int) -> list[str]:
+        """emp_ids ranked prefix matches first, then substring, then fuzzy."""
+        q = q.strip().lower()
+        with self._lock:
+            self._ensure_loaded(db)
+            ranked: dict[str, float] = {}
+            i = bisect.bisect_left(self._sorted, (q, ""))
+            while i < len(self._sorted) and self._sorted[i][0].startswith(q) and len(ranked) < limit:
+                ranked.setdefault(self._sorted[i][1], 3.0)
+                i += 1
+            grams = _ngrams(q)
+            if len(ranked) < limit and grams:
+                hits = Counter()
+                for gram in grams:
+                    hits.update(self._postings.get(gram, ()))
+                scored = []
+                for emp_id, shared in hits.items():
+                    if emp_id in ranked:
+                        continue
+                    if shared == len(grams) and any(q in field for field in self._docs[emp_id]):
+                        scored.append((2.0, emp_id))
+                    elif shared / len(grams) >= FUZZY_MIN_SCORE:
+                        scored.append((shared / len(grams), emp_id))
+                scored.sort(key=lambda item: (-item[0], item[1]))
+                for score, emp_id in scored[:limit - len(ranked)]:
+                    ranked[emp_id] = score
+            elif len(ranked) < limit:
+                # Too short for trigrams ("an" in "ryan"): scan for substrings like ILIKE would
+                for emp_id in sorted(self._docs):
+                    if len(ranked) >= limit:
+                        break
+                    if emp_id not in ranked and any(q in field for field in self._docs[emp_id]):
+                        ranked[emp_id] = 2.0
+            return list(ranked)[:limit]
+
+
+search_index = NgramIndex(SEARCH_INDEX_TTL_SECONDS)
+
+
+def _search_postgres(db: Session, q: str, limit: int):
+    # ILIKE and the % similarity operator are both served by the gin_trgm_ops indexes
+    columns = (Employee.name, Employee.emp_id, Employee.dept)
+    similarity = func.greatest(*(func.similarity(column, q) for column in columns))
+    prefix = or_(*(column.istartswith(q, autoescape=True) for column in columns))
+    query = (
+        select(Employee)
+        .where(or_(
+            *(column.icontains(q, autoescape=True) for column in columns),
+            *(column.op("%")(q) for column in columns),
+        ))
+        .order_by(case((prefix, 0), else_=1), similarity.desc(), Employee.emp_id)
+        .limit(limit)
+    )
+    return db.scalars(query).all()
+
+
+def search_employees(db: Session, q: str, limit: int = 20):
+    """Prefix, substring and fuzzy search over employee name, emp_id and dept."""
+    if not q.strip():
+        return []
+    if db.get_bind().dialect.name == "postgresql":
+        return _search_postgres(db, q.strip(), limit)
+    emp_ids = search_index.search(db, q, limit)
+    if not emp_ids:
+        return []
+    employees = {e.emp_id: e for e in db.query(Employee).filter(Employee.emp_id.in_(emp_ids))}
+    return [employees[emp_id] for emp_id in emp_ids if emp_id in employees]
@@ -1,17 +1,31 @@
+from collections import OrderedDict
+from dataclasses import dataclass, replace
 from datetime import datetime, timedelta, timezone
-import os, random
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor
+import asyncio, hashlib, multiprocessing, os, random, threading, time
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
-from .database import SessionLocal
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from .database import SessionLocal, AsyncSessionLocal
 from . import models
 
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM")
 ACCESS_TOKEN_EXPIRE_HOURS = 24  
 
+# bcrypt pool: "thread" is fine for most loads (bcrypt releases the GIL),
+# "process" trades memory for throughput during large login bursts.
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS") or os.cpu_count() or 1)
+PASSWORD_HASH_MODE = os.getenv("PASSWORD_HASH_MODE") or "thread"
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE") or 10000)
+# How long a cached token's role/name is trusted before the employee row is checked again
+TOKEN_CACHE_TTL_SECONDS = float(os.getenv("TOKEN_CACHE_TTL_SECONDS") or 60)
+
+ROLES = ("employee", "admin")
+
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
@@ -22,6 +36,94 @@ def verify_password(plain_password, hashed_password):
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+
+class PasswordHasher:
+    """Runs bcrypt in a bounded worker pool so it never blocks the event loop.
+
+    At most `workers` hashes run at once; anything beyond that waits in the
+    executor queue and is reported as `queue_depth`.
+    """
+
+    def __init__(self, workers: int, mode: str = "thread"):
+        if mode not in ("thread", "process"):
+            raise ValueError(f"Unknown password hash mode '{mode}'")
+        self.workers = max(1, workers)
+        self.mode = mode
+        self.in_flight = 0
+        self.completed = 0
+        self.peak_queue_depth = 0
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def queue_depth(self) -> int:
+        return max(0, self.in_flight - self.workers)
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                if self.mode == "process":
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                    )
+                else:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+            return self._executor
+
+    def _submit(self, fn, *args) -> Future:
+        executor = self._get_executor()
+        with self._lock:
+            self.in_flight += 1
+            self.peak_queue_depth = max(self.peak_queue_depth, self.queue_depth)
+        try:
+            future = executor.submit(fn, *args)
+        except Exception:
+            with self._lock:
+                self.in_flight -= 1
+            raise
+        future.add_done_callback(self._on_done)
+        return future
+
+    def _on_done(self, future: Future):
+        with self._lock:
+            self.in_flight -= 1
+            self.completed += 1
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await asyncio.wrap_future(self._submit(verify_password, plain_password, hashed_password))
+
+    async def hash(self, password: str) -> str:
+        return await asyncio.wrap_future(self._submit(get_password_hash, password))
+
+    def hash_blocking(self, password: str) -> str:
+        """For sync callers (threadpool routes, scripts); still bounded by the pool."""
+        return self._submit(get_password_hash, password).result()
+
+    def hash_many(self, passwords: list[str]) -> list[str]:
+        futures = [self._submit(get_password_hash, p) for p in passwords]
+        return [f.result() for f in futures]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "workers": self.workers,
+                "in_flight": self.in_flight,
+                "queue_depth": self.queue_depth,
+                "peak_queue_depth": self.peak_queue_depth,
+                "completed": self.completed,
+            }
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+password_hasher = PasswordHasher(PASSWORD_HASH_WORKERS, PASSWORD_HASH_MODE)
+
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
     if expires_delta:
@@ -32,32 +134,136 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def authenticate_user(db: Session, emp_id: str, password: str):
-    user = db.query(models.Employee).filter(models.Employee.emp_id == emp_id).first()
+async def authenticate_user(db: AsyncSession, emp_id: str, password: str):
+    result = await db.execute(select(models.Employee).where(models.Employee.emp_id == emp_id))
+    user = result.scalars().first()
     if not user:
         return False
-    if not verify_password(password, user.password):
+    if not await password_hasher.verify(password, user.password):
         return False
     return user
 
-def get_current_user(token: str = Depends(oauth2_scheme)):
-    credentials_exception = HTTPException(
+@dataclass(frozen=True)
+class TokenClaims:
+    emp_id: str
+    role: str
+    name: str | None
+    expires_at: float
+
+
+class VerifiedTokenCache:
+    """Bounded LRU of tokens whose signature and employee row have already been checked.
+
+    Keyed by the token's SHA-256 so raw tokens are never kept in memory;
+    an entry is dropped once the token's own `exp` has passed or it is older
+    than `ttl`, so a demoted or deleted employee loses access within `ttl`.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, tuple[TokenClaims, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token: str) -> TokenClaims | None:
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            claims, checked_at = entry
+            if claims.expires_at <= time.time() or time.monotonic() - checked_at > self.ttl:
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return claims
+
+    def put(self, token: str, claims: TokenClaims):
+        if self.maxsize <= 0 or claims.expires_at <= time.time():
+            return
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (claims, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, emp_id: str):
+        """Forget `emp_id`'s tokens on this worker; other workers re-check within `ttl`."""
+        with self._lock:
+            for key in [key for key, (claims, _) in self._entries.items() if claims.emp_id == emp_id]:
+                del self._entries[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._entries), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
+
+
+token_cache = VerifiedTokenCache(TOKEN_CACHE_SIZE, TOKEN_CACHE_TTL_SECONDS)
+
+
+def credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+def decode_token(token: str) -> TokenClaims:
+    """Verify a token's signature and expiry and return the claims it carries."""
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         emp_id: str = payload.get("sub")
         if emp_id is None:
-            raise credentials_exception
+            raise credentials_exception()
     except JWTError:
-        raise credentials_exception
-    # Here, we could fetch user from DB, but for simplicity, return emp_id
-    # In production, verify user still exists
-    return emp_id
+        raise credentials_exception()
+    # Tokens issued before role/name claims existed fall back to the emp_id prefix convention
+    role = payload.get("role") or ("admin" if emp_id.startswith("ADMIN") else "employee")
+    return TokenClaims(emp_id=emp_id, role=role, name=payload.get("name"), expires_at=payload.get("exp") or 0)
+
+async def verify_token(token: str) -> TokenClaims:
+    """Claims for a request: the token's identity with the employee's current role and name.
+
+    The employee row is looked up on a cache miss, so role changes and
+    deletions take effect without waiting for the token to expire.
+    """
+    claims = token_cache.get(token)
+    if claims is not None:
+        return claims
+    claims = decode_token(token)
+    async with AsyncSessionLocal() as db:
+        employee = (await db.execute(
+            select(models.Employee.role, models.Employee.name).where(models.Employee.emp_id == claims.emp_id)
+        )).first()
+    if employee is None:
+        raise credentials_exception()
+    claims = replace(claims, role=employee.role or "employee", name=employee.name)
+    token_cache.put(token, claims)
+    return claims
 
-def get_current_admin(current_user: str = Depends(get_current_user)):
-    if not current_user.startswith("ADMIN"):
+def require_role(claims: TokenClaims, role: str) -> TokenClaims:
+    if claims.role != role:
         raise HTTPException(status_code=403, detail="Not enough permissions")
-    return current_user
\ No newline at end of file
+    return claims
+
+async def get_current_claims(token: str = Depends(oauth2_scheme)) -> TokenClaims:
+    return await verify_token(token)
+
+async def get_current_user(claims: TokenClaims = Depends(get_current_claims)):
+    return claims.emp_id
+
+async def get_current_employee(claims: TokenClaims = Depends(get_current_claims)) -> TokenClaims:
+    return require_role(claims, "employee")
+
+async def get_current_admin(claims: TokenClaims = Depends(get_current_claims)):
+    return require_role(claims, "admin").emp_id
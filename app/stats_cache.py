@@ -0,0 +1,191 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from .models import Department, Employee
+
+DEPT_STATS_CACHE = (os.getenv("DEPT_STATS_CACHE") or "true").lower() in ("1", "true", "yes")
+# Full reload interval; also picks up writes made by other workers or scripts
+DEPT_STATS_TTL_SECONDS = float(os.getenv("DEPT_STATS_TTL_SECONDS") or 60)
+EMPLOYEE_COUNT_CACHE_SIZE = int(os.getenv("EMPLOYEE_COUNT_CACHE_SIZE") or 256)
+
+
+def query_department_stats(db: Session, names: list[str] | None = None) -> dict[str, dict]:
+    """Per-department headcount and salary aggregates in a single GROUP BY."""
+    query = (
+        select(
+            Department.name,
+            func.count(Employee.emp_id),
+            func.coalesce(func.sum(Employee.salary), 0),
+            func.min(Employee.salary),
+            func.max(Employee.salary),
+        )
+        .outerjoin(Employee, Employee.dept == Department.name)
+        .group_by(Department.id, Department.name)
+        .order_by(Department.id)
+    )
+    if names is not None:
+        query = query.where(Department.name.in_(names))
+    return {
+        name: {"count": count, "total": float(total), "min": min_salary, "max": max_salary}
+        for name, count, total, min_salary, max_salary in db.execute(query)
+    }
+
+
+def _as_response(name: str, stats: dict) -> dict:
+    count = stats["count"]
+    return {
+        "department": name,
+        "employee_count": count,
+        "total_salary": stats["total"],
+        "average_salary": stats["total"] / count if count > 0 else 0,
+        "min_salary": stats["min"] if count > 0 else 0,
+        "max_salary": stats["max"] if count > 0 else 0,
+    }
+
+
+class DepartmentStatsCache:
+    """In-process department stats kept current by the employee/department crud writes.
+
+    Counts and totals are adjusted exactly; removing the current min or max
+    salary marks that department for a one-department re-aggregate on the
+    next read. `invalidate()` takes no lock, since remote writes call it on the
+    event loop while `get()` may hold the lock for a query.
+    """
+
+    def __init__(self, enabled: bool, ttl: float):
+        self.enabled = enabled
+        self.ttl = ttl
+        self._stats: dict[str, dict] | None = None
+        self._dirty: set[str] = set()
+        self._loaded_at = 0.0
+        # Bumped by invalidate(); the stats are reloaded when it moved since the last load
+        self._generation = 0
+        self._loaded_generation = 0
+        self._lock = threading.Lock()
+
+    def get(self, db: Session) -> list[dict]:
+        if not self.enabled:
+            return [_as_response(name, stats) for name, stats in query_department_stats(db).items()]
+        with self._lock:
+            generation = self._generation
+            if self._stats is None or generation != self._loaded_generation or time.monotonic() - self._loaded_at > self.ttl:
+                self._stats = query_department_stats(db)
+                self._dirty.clear()
+                self._loaded_at = time.monotonic()
+                self._loaded_generation = generation
+            elif self._dirty:
+                self._stats.update(query_department_stats(db, list(self._dirty)))
+                self._dirty.clear()
+            return [_as_response(name, stats) for name, stats in self._stats.items()]
+
+    def invalidate(self):
+        self._generation += 1
+
+    def employee_added(self, dept: str, salary: float):
+        with self._lock:
+            if self._stats is None:
+                return
+            stats = self._stats.get(dept)
+            if stats is None:
+                self._dirty.add(dept)
+                return
+            stats["count"] += 1
+            stats["total"] += salary
+            stats["min"] = salary if stats["min"] is None else min(stats["min"], salary)
+            stats["max"] = salary if stats["max"] is None else max(stats["max"], salary)
+
+    def employee_removed(self, dept: str, salary: float):
+        with self._lock:
+            if self._stats is None:
+                return
+            stats = self._stats.get(dept)
+            if stats is None:
+                return
+            stats["count"] -= 1
+            stats["total"] -= salary
+            if salary in (stats["min"], stats["max"]):
+                self._dirty.add(dept)
+
+    def employee_changed(self, old_dept: str, old_salary: float, new_dept: str, new_salary: float):
+        if (old_dept, old_salary) == (new_dept, new_salary):
+            return
+        self.employee_removed(old_dept, old_salary)
+        self.employee_added(new_dept, new_salary)
+
+    def department_added(self, name: str):
+        with self._lock:
+            if self._stats is not None and name not in self._stats:
+                self._stats[name] = {"count": 0, "total": 0.0, "min": None, "max": None}
+
+    def department_removed(self, name: str):
+        with self._lock:
+            if self._stats is not None:
+                self._stats.pop(name, None)
+                self._dirty.discard(name)
+
+
+department_stats = DepartmentStatsCache(DEPT_STATS_CACHE, DEPT_STATS_TTL_SECONDS)
+
+
+class EmployeeCountCache:
+    """Employee totals per name filter, adjusted by the employee crud writes.
+
+    A filter matches like the list endpoint's ILIKE '%name%', so a write
+    only touches the cached totals whose filter matches the employee's name.
+    Entries are recounted after `ttl` seconds to pick up writes made elsewhere.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._totals: OrderedDict[str, tuple[int, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(name: str | None) -> str:
+        return (name or "").lower()
+
+    def get(self, name: str | None, count: Callable[[], int]) -> int:
+        key = self._key(name)
+        with self._lock:
+            entry = self._totals.get(key)
+            if entry is not None and time.monotonic() - entry[1] <= self.ttl:
+                self._totals.move_to_end(key)
+                return entry[0]
+        total = count()
+        if self.maxsize > 0:
+            with self._lock:
+                self._totals[key] = (total, time.monotonic())
+                self._totals.move_to_end(key)
+                while len(self._totals) > self.maxsize:
+                    self._totals.popitem(last=False)
+        return total
+
+    def _adjust(self, name: str, delta: int):
+        name = name.lower()
+        with self._lock:
+            for key, (total, loaded_at) in self._totals.items():
+                if key in name:
+                    self._totals[key] = (total + delta, loaded_at)
+
+    def employee_added(self, name: str):
+        self._adjust(name, 1)
+
+    def employee_removed(self, name: str):
+        self._adjust(name, -1)
+
+    def employee_renamed(self, old_name: str, new_name: str):
+        if old_name != new_name:
+            self.employee_removed(old_name)
+            self.employee_added(new_name)
+
+    def invalidate(self):
+        with self._lock:
+            self._totals.clear()
+
+
+employee_counts = EmployeeCountCache(EMPLOYEE_COUNT_CACHE_SIZE, DEPT_STATS_TTL_SECONDS)
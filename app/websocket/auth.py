@@ -0,0 +1,26 @@
+from fastapi import HTTPException, WebSocket
+from ..database import AsyncSessionLocal
+from ..security import decode_token
+from .. import crud
+
+
+async def authenticate(websocket: WebSocket, emp_id: str, token: str | None) -> str | None:
+    """Check a socket's `emp_id` (and its token, when one is sent) and return the employee's name.
+
+    The session is held only for the lookup, so long-lived sockets never pin a
+    pooled connection. On failure the socket is closed with 1008 and None returned.
+    """
+    if token:
+        try:
+            claims = decode_token(token)
+        except HTTPException:
+            claims = None
+        if claims is None or claims.emp_id != emp_id:
+            await websocket.close(code=1008)
+            return None
+    async with AsyncSessionLocal() as db:
+        employee = await crud.get_employee_async(db, emp_id)
+    if not employee:
+        await websocket.close(code=1008)
+        return None
+    return employee.name
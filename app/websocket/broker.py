@@ -0,0 +1,175 @@
+import abc
+import asyncio
+import json
+import logging
+import os
+import uuid
+from typing import Callable
+from sqlalchemy.engine import make_url
+
+# "memory" delivers within this process only; "postgres" fans out to every
+# worker listening on the same database via LISTEN/NOTIFY
+WS_BROKER = os.getenv("WS_BROKER") or "memory"
+WS_BROKER_URL = os.getenv("WS_BROKER_URL") or os.getenv("DATABASE_URL")
+WS_BROKER_CHANNEL = os.getenv("WS_BROKER_CHANNEL") or "ems_ws"
+
+# Postgres rejects NOTIFY payloads of 8000 bytes or more
+PG_NOTIFY_MAX_BYTES = 7999
+RECONNECT_DELAY_SECONDS = 1.0
+
+Handler = Callable[[str, dict], None]
+
+logger = logging.getLogger(__name__)
+
+
+class Broker(abc.ABC):
+    """Publishes (channel, payload) messages to every worker, including this one.
+
+    `handler` is called once per message per worker, on that worker's event loop.
+    """
+
+    def __init__(self, handler: Handler):
+        self.handler = handler
+        self.published = 0
+        self.received = 0
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def publish(self, channel: str, payload: dict):
+        await self.publish_many(channel, [payload])
+
+    @abc.abstractmethod
+    async def publish_many(self, channel: str, payloads: list[dict]):
+        ...
+
+    def _deliver(self, channel: str, payload: dict):
+        self.received += 1
+        try:
+            self.handler(channel, payload)
+        except Exception:
+            logger.exception("Broker handler failed on '%s'", channel)
+
+    def stats(self) -> dict:
+        return {"backend": type(self).__name__, "published": self.published, "received": self.received}
+
+
+class InMemoryBroker(Broker):
+    """Single-process backend: publishing is delivering."""
+
+    async def publish_many(self, channel: str, payloads: list[dict]):
+        for payload in payloads:
+            self.published += 1
+            self._deliver(channel, payload)
+
+
+class PostgresBroker(Broker):
+    """Cross-worker backend on Postgres LISTEN/NOTIFY.
+
+    Messages are delivered to this worker's sockets straight away and NOTIFYed
+    for the others; each worker skips its own notifications by origin id.
+    Payloads too large for NOTIFY are delivered locally only. The listening
+    connection is re-established if it drops; messages sent meanwhile are lost,
+    as with any fire-and-forget pub/sub.
+    """
+
+    def __init__(self, handler: Handler, url: str, channel: str = WS_BROKER_CHANNEL):
+        super().__init__(handler)
+        # asyncpg wants a plain postgresql:// URL without a SQLAlchemy driver suffix
+        self.dsn = make_url(url).set(drivername="postgresql").render_as_string(hide_password=False)
+        self.channel = channel
+        self.origin = uuid.uuid4().hex
+        self.oversized = 0
+        self._listener = None
+        self._publisher = None
+        self._publish_lock = asyncio.Lock()
+        self._reconnect_task: asyncio.Task | None = None
+        self._stopping = False
+
+    async def start(self):
+        self._stopping = False
+        await self._connect()
+
+    async def _connect(self):
+        import asyncpg
+        self._listener = await asyncpg.connect(self.dsn)
+        self._listener.add_termination_listener(self._on_terminated)
+        await self._listener.add_listener(self.channel, self._on_notify)
+        self._publisher = await asyncpg.connect(self.dsn)
+
+    def _on_terminated(self, connection):
+        if not self._stopping and self._reconnect_task is None:
+            self._reconnect_task = asyncio.get_running_loop().create_task(self._reconnect())
+
+    async def _reconnect(self):
+        try:
+            while not self._stopping:
+                await self._close_connections()
+                try:
+                    await self._connect()
+                    return
+                except Exception as e:
+                    logger.warning("Broker reconnect failed: %r", e)
+                    await asyncio.sleep(RECONNECT_DELAY_SECONDS)
+        finally:
+            self._reconnect_task = None
+
+    async def _close_connections(self):
+        for conn in (self._listener, self._publisher):
+            if conn is not None and not conn.is_closed():
+                try:
+                    await conn.close(timeout=RECONNECT_DELAY_SECONDS)
+                except Exception:
+                    conn.terminate()
+        self._listener = self._publisher = None
+
+    async def stop(self):
+        self._stopping = True
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+        await self._close_connections()
+
+    def _on_notify(self, connection, pid, channel, data: str):
+        try:
+            envelope = json.loads(data)
+        except ValueError:
+            return
+        if envelope.get("origin") == self.origin:
+            return
+        self._deliver(envelope["channel"], envelope["payload"])
+
+    async def publish_many(self, channel: str, payloads: list[dict]):
+        remote = []
+        for payload in payloads:
+            self.published += 1
+            self._deliver(channel, payload)
+            data = json.dumps({"origin": self.origin, "channel": channel, "payload": payload}, default=str)
+            if len(data.encode()) > PG_NOTIFY_MAX_BYTES:
+                self.oversized += 1
+                logger.warning("Broker payload on '%s' too large for NOTIFY; delivered locally only", channel)
+                continue
+            remote.append(data)
+        if not remote or self._publisher is None:
+            return
+        try:
+            # One round trip for the whole batch
+            async with self._publish_lock:
+                await self._publisher.execute("SELECT pg_notify($1, unnest($2::text[]))", self.channel, remote)
+        except Exception as e:
+            logger.error("Broker publish on '%s' failed: %r", channel, e)
+
+    def stats(self) -> dict:
+        return {**super().stats(), "oversized": self.oversized}
+
+
+def create_broker(handler: Handler, backend: str = WS_BROKER, url: str | None = WS_BROKER_URL) -> Broker:
+    if backend == "memory":
+        return InMemoryBroker(handler)
+    if backend == "postgres":
+        if not url:
+            raise ValueError("WS_BROKER=postgres needs WS_BROKER_URL or DATABASE_URL")
+        return PostgresBroker(handler, url)
+    raise ValueError(f"Unknown WebSocket broker '{backend}'")
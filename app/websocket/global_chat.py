@@ -1,33 +1,34 @@
-from fastapi import WebSocket, APIRouter, WebSocketDisconnect, Depends
-from sqlalchemy.orm import Session
+from fastapi import WebSocket, APIRouter, WebSocketDisconnect
+from .auth import authenticate
 from .manager import manager
-from ..database import get_db
-from ..models import Employee
 from .. import crud
+from ..chat_history import chat_events
 import json
 
 router = APIRouter()
 
 @router.websocket("/ws/chat/global")
-async def websocket_chat(websocket: WebSocket, emp_id: str, db: Session = Depends(get_db)):
-    employee = db.query(Employee).filter(Employee.emp_id == emp_id).first()
-    if not employee:
-        await websocket.close(code=1008)
+async def websocket_chat(websocket: WebSocket, emp_id: str, token: str | None = None, last_seen_id: int | None = None):
+    # No session is held for the socket's lifetime; messages are persisted by the chat writer's own batches
+    emp_name = await authenticate(websocket, emp_id, token)
+    if emp_name is None:
         return
-    
-    await manager.connect_global_chat(websocket, emp_id)
+
+    # A reconnecting client gets what it missed as one "sync" frame
+    first_message = (lambda: chat_events.sync_frame(last_seen_id)) if last_seen_id else None
+    await manager.connect_global_chat(websocket, emp_id, first_message, emp_name)
     try:
         while True:
             data = await websocket.receive_text()
             message_data = json.loads(data)
             
-            saved_msg = crud.save_chat_message(db=db, emp_id=emp_id, emp_name=employee.name, message=message_data.get("message", ""))
+            saved_msg = await crud.save_chat_message(emp_id=emp_id, emp_name=emp_name, message=message_data.get("message", ""))
             
             broadcast_message = {
                 "type": "Global_chat",
                 "id": saved_msg.id,
                 "emp_id": emp_id,
-                "emp_name": employee.name,
+                "emp_name": emp_name,
                 "message": message_data.get("message", ""),
                 "created_at": saved_msg.created_at.isoformat()
             }
@@ -35,4 +36,6 @@ async def websocket_chat(websocket: WebSocket, emp_id: str, db: Session = Depend
             await manager.send_global_chat(broadcast_message)
                 
     except WebSocketDisconnect:
-        manager.disconnect_global_chat(websocket)
\ No newline at end of file
+        pass
+    finally:
+        manager.disconnect_global_chat(websocket)
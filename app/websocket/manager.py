@@ -1,49 +1,412 @@
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from datetime import date, datetime
+from typing import Callable
 from fastapi import WebSocket
+from .broker import create_broker
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+WS_SEND_TIMEOUT_SECONDS = float(os.getenv("WS_SEND_TIMEOUT_SECONDS") or 5)
+# Outbound messages buffered per socket before the overflow policy kicks in
+WS_SEND_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE") or 256)
+# "drop_oldest" keeps the socket and discards its oldest queued message,
+# "disconnect" closes sockets that cannot keep up
+WS_OVERFLOW_POLICY = os.getenv("WS_OVERFLOW_POLICY") or "drop_oldest"
+
+# Chat join/leave changes are collected for this long and pushed as one presence event
+WS_PRESENCE_FLUSH_MS = float(os.getenv("WS_PRESENCE_FLUSH_MS") or 250)
+# Every worker announces itself this often; a worker silent for PRESENCE_MISSED_HEARTBEATS
+# intervals (crashed, killed) is dropped from everyone's presence
+WS_PRESENCE_HEARTBEAT_SECONDS = float(os.getenv("WS_PRESENCE_HEARTBEAT_SECONDS") or 15)
+PRESENCE_MISSED_HEARTBEATS = 3
+
+# Close code sent to consumers disconnected for falling behind ("try again later")
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+logger = logging.getLogger(__name__)
+
+
+def _json_default(value):
+    # Dates as RFC 3339, the way orjson writes them natively, so the wire format does not depend on it
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return str(value)
+
+
+def encode_frame(message: dict) -> str:
+    """JSON text for a WebSocket frame; encoded once per broadcast and shared by every recipient."""
+    if orjson is not None:
+        return orjson.dumps(message, default=str).decode()
+    return json.dumps(message, separators=(",", ":"), default=_json_default)
+
+
+class QueuedSocket:
+    """A WebSocket with a bounded outbound queue drained by its own writer task.
+
+    `enqueue` never waits, so one stalled client cannot hold up a broadcast.
+    A send that fails or exceeds the send timeout closes the socket.
+    """
+
+    def __init__(self, websocket: WebSocket, emp_id: str, owner: "ConnectionManager", emp_name: str = ""):
+        self.websocket = websocket
+        self.emp_id = emp_id
+        self.emp_name = emp_name
+        self.closed = False
+        self._owner = owner
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=owner.queue_size)
+        self._writer = asyncio.create_task(self._write_loop())
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def enqueue(self, frame: str) -> bool:
+        if self.closed:
+            return False
+        owner = self._owner
+        if self._queue.full():
+            if owner.overflow_policy == "disconnect":
+                owner.slow_disconnects += 1
+                self.close(SLOW_CONSUMER_CLOSE_CODE)
+                return False
+            self._queue.get_nowait()
+            owner.dropped += 1
+        self._queue.put_nowait(frame)
+        owner.enqueued += 1
+        owner.peak_queue_depth = max(owner.peak_queue_depth, self._queue.qsize())
+        return True
+
+    async def _write_loop(self):
+        while True:
+            frame = await self._queue.get()
+            try:
+                await asyncio.wait_for(self.websocket.send_text(frame), self._owner.send_timeout)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.info("WebSocket send failed for %s: %r", self.emp_id, e)
+                self._owner.send_failures += 1
+                self.close()
+                return
+            self._owner.sent += 1
+
+    def stop(self):
+        """Stop the writer and unregister the socket, leaving the socket itself alone."""
+        if self.closed:
+            return
+        self.closed = True
+        if self._writer is not asyncio.current_task():
+            self._writer.cancel()
+        self._owner._forget(self)
+
+    def close(self, code: int = 1000):
+        """`stop`, then close the socket in the background."""
+        if self.closed:
+            return
+        self.stop()
+        self._owner._spawn(self._close_socket(code))
+
+    async def _close_socket(self, code: int):
+        try:
+            await asyncio.wait_for(self.websocket.close(code=code), self._owner.send_timeout)
+        except Exception:
+            pass
+
 
 class ConnectionManager:
-    def __init__(self):
-        self.notification_connections: dict[str, list[WebSocket]] = {}
-        self.global_chat: dict[str, list[WebSocket]] = {}
-    
+    """WebSocket registry and fan-out for this worker.
+
+    Sockets are indexed both ways (socket -> connection, emp_id -> that
+    employee's connections), so connect and disconnect are O(1) and an
+    employee may have any number of tabs open. Chat presence is merged from
+    every worker's batched join/leave events on the "presence" channel:
+    `online` holds everyone in the global chat on any worker. Workers also
+    send heartbeats; one that stops (crashed, killed) is dropped after
+    PRESENCE_MISSED_HEARTBEATS intervals, and a heartbeat whose count does
+    not match this worker's view of the sender asks it for a snapshot.
+    """
+
+    def __init__(self, queue_size: int = WS_SEND_QUEUE_SIZE, overflow_policy: str = WS_OVERFLOW_POLICY,
+                 send_timeout: float = WS_SEND_TIMEOUT_SECONDS, presence_flush_ms: float = WS_PRESENCE_FLUSH_MS,
+                 heartbeat_interval: float = WS_PRESENCE_HEARTBEAT_SECONDS):
+        if overflow_policy not in ("drop_oldest", "disconnect"):
+            raise ValueError(f"Unknown WebSocket overflow policy '{overflow_policy}'")
+        self.queue_size = max(1, queue_size)
+        self.overflow_policy = overflow_policy
+        self.send_timeout = send_timeout
+        self.presence_interval = presence_flush_ms / 1000
+        self.heartbeat_interval = heartbeat_interval
+        self._sockets: dict[WebSocket, QueuedSocket] = {}
+        self.notification_connections: dict[str, set[QueuedSocket]] = {}
+        self.global_chat: dict[str, set[QueuedSocket]] = {}
+        self._chat_sockets: set[QueuedSocket] = set()
+        self.worker_id = uuid.uuid4().hex
+        # worker id -> {emp_id: name} in the global chat there; `online` is their union
+        self._presence_views: dict[str, dict[str, str]] = {}
+        # Other workers' last presence message (monotonic time)
+        self._presence_seen: dict[str, float] = {}
+        self._online_counts: dict[str, int] = {}
+        self.online: dict[str, str] = {}
+        # Local changes not yet published
+        self._pending_joined: dict[str, str] = {}
+        self._pending_left: set[str] = set()
+        self._presence_dirty = asyncio.Event()
+        self._presence_task: asyncio.Task | None = None
+        self._heartbeat_task: asyncio.Task | None = None
+        self.enqueued = 0
+        self.sent = 0
+        self.dropped = 0
+        self.slow_disconnects = 0
+        self.send_failures = 0
+        self.peak_queue_depth = 0
+        # Strong references to background socket closes so they are not garbage collected mid-close
+        self._background: set[asyncio.Task] = set()
+        # Every delivery goes through the broker so sockets on other workers get it too
+        self.broker = create_broker(self._on_broker_message)
+        self._subscribers: dict[str, list[Callable[[dict], None]]] = {}
+        self.subscribe("chat", self._deliver_chat)
+        self.subscribe("chat_update", self._deliver_chat)
+        self.subscribe("notify", self._deliver_notification)
+        self.subscribe("presence", self._on_presence)
+
+    def subscribe(self, channel: str, handler: Callable[[dict], None]):
+        """Call `handler(payload)` on this worker for every message published on `channel` by any worker."""
+        self._subscribers.setdefault(channel, []).append(handler)
+
+    async def publish(self, channel: str, payload: dict):
+        await self.broker.publish(channel, payload)
+
+    def _on_broker_message(self, channel: str, payload: dict):
+        for handler in self._subscribers.get(channel, ()):
+            handler(payload)
+
+    def _deliver_chat(self, message: dict):
+        if not self._chat_sockets:
+            return
+        frame = encode_frame(message)
+        for conn in list(self._chat_sockets):
+            conn.enqueue(frame)
+
+    def _deliver_notification(self, payload: dict):
+        conns = list(self.notification_connections.get(payload["emp_id"], ()))
+        if not conns:
+            return
+        # One encoding for all of the employee's tabs
+        frame = encode_frame(payload["message"])
+        for conn in conns:
+            conn.enqueue(frame)
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    def _forget(self, conn: QueuedSocket):
+        if self._sockets.get(conn.websocket) is conn:
+            del self._sockets[conn.websocket]
+        if conn in self._chat_sockets:
+            self._chat_sockets.discard(conn)
+            conns = self.global_chat[conn.emp_id]
+            conns.discard(conn)
+            if not conns:
+                del self.global_chat[conn.emp_id]
+                self._local_presence(conn.emp_id, None)
+            return
+        conns = self.notification_connections.get(conn.emp_id)
+        if conns is not None:
+            conns.discard(conn)
+            if not conns:
+                del self.notification_connections[conn.emp_id]
+
+    def _connections(self):
+        return self._sockets.values()
+
     async def connect_notification(self, websocket: WebSocket, emp_id : str):
         await websocket.accept()
-        if emp_id not in self.notification_connections:
-            self.notification_connections[emp_id] = []
-        
-        self.notification_connections[emp_id].append(websocket)
-    
+        conn = QueuedSocket(websocket, emp_id, self)
+        self._sockets[websocket] = conn
+        self.notification_connections.setdefault(emp_id, set()).add(conn)
+
     def disconnect_notification (self, websocket : WebSocket, emp_id : str):
-        if emp_id in self.notification_connections:    
-            if websocket in self.notification_connections[emp_id]:  
-                self.notification_connections[emp_id].remove(websocket)
-            if not self.notification_connections[emp_id]:
-                del self.notification_connections[emp_id]
-    
+        conn = self._sockets.get(websocket)
+        if conn is not None:
+            conn.stop()
+
     async def send_notification(self, message : dict, emp_id : str):
-        if emp_id in self.notification_connections:
-            for connection in self.notification_connections[emp_id]:
-                await connection.send_json(message)
-                
-    
-    async def connect_global_chat(self, websocket : WebSocket, emp_id: str):
+        await self.broker.publish("notify", {"emp_id": emp_id, "message": message})
+
+    async def send_notifications(self, deliveries: list[tuple[str, dict]]):
+        """Publish every (emp_id, message) pair in one broker call; never waits on a client."""
+        await self.broker.publish_many("notify", [{"emp_id": emp_id, "message": message} for emp_id, message in deliveries])
+
+    async def connect_global_chat(self, websocket : WebSocket, emp_id: str, first_message: Callable[[], dict | None] | None = None,
+                                  emp_name: str = ""):
+        """Accept and register a chat socket; every tab an employee opens gets its own.
+
+        `first_message` is built after the socket is registered and queued
+        ahead of any broadcast, with no await in between, so a catch-up frame
+        neither misses nor repeats a message.
+        """
         await websocket.accept()
-        self.global_chat[emp_id] = websocket
-    
+        conn = QueuedSocket(websocket, emp_id, self, emp_name)
+        self._sockets[websocket] = conn
+        self._chat_sockets.add(conn)
+        conns = self.global_chat.setdefault(emp_id, set())
+        conns.add(conn)
+        if len(conns) == 1:
+            self._local_presence(emp_id, emp_name)
+        if first_message is not None and (message := first_message()) is not None:
+            conn.enqueue(encode_frame(message))
+
     def disconnect_global_chat(self, websocket : WebSocket):
-        emp_id_to_remove = None
-        for emp_id, ws in self.global_chat.items():
-            if ws == websocket:
-                emp_id_to_remove = emp_id
-                break
-        if emp_id_to_remove:
-            del self.global_chat[emp_id_to_remove]
-    
+        conn = self._sockets.get(websocket)
+        if conn is not None:
+            conn.stop()
+
     async def send_global_chat(self, message : dict):
-        for emp_id, chat_ws in self.global_chat.items():
-            try:
-                await chat_ws.send_json(message)
-            except Exception as e:
-                print(f"Failed to send message to {emp_id}: {e}")
+        await self.broker.publish("chat", message)
 
-manager = ConnectionManager()
+    def _local_presence(self, emp_id: str, emp_name: str | None):
+        """Queue a join (`emp_name` set) or leave for the next presence batch; a join and leave in one batch cancel out."""
+        if emp_name is not None:
+            if emp_id in self._pending_left:
+                self._pending_left.discard(emp_id)
+            else:
+                self._pending_joined[emp_id] = emp_name
+        elif self._pending_joined.pop(emp_id, None) is None:
+            self._pending_left.add(emp_id)
+        self._presence_dirty.set()
+
+    def _local_snapshot(self) -> dict[str, str]:
+        return {emp_id: next(iter(conns)).emp_name for emp_id, conns in self.global_chat.items()}
+
+    def _publish_snapshot(self):
+        self._spawn(self._publish_presence({"worker": self.worker_id, "snapshot": self._local_snapshot()}))
+
+    async def _publish_presence(self, event: dict):
+        try:
+            await self.broker.publish("presence", event)
+        except Exception as e:
+            logger.warning("Presence publish failed: %r", e)
+
+    async def _presence_loop(self):
+        while True:
+            await self._presence_dirty.wait()
+            await asyncio.sleep(self.presence_interval)
+            self._presence_dirty.clear()
+            joined, left = self._pending_joined, list(self._pending_left)
+            self._pending_joined, self._pending_left = {}, set()
+            if joined or left:
+                await self._publish_presence({"worker": self.worker_id, "joined": joined, "left": left})
+
+    async def _heartbeat_loop(self):
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            # What the others should have for this worker: everything but the unpublished changes
+            published = len(self.global_chat) - len(self._pending_joined) + len(self._pending_left)
+            await self._publish_presence({"worker": self.worker_id, "heartbeat": True, "online": published})
+            self._expire_presence()
 
+    def _expire_presence(self):
+        deadline = time.monotonic() - self.heartbeat_interval * PRESENCE_MISSED_HEARTBEATS
+        for worker, seen in list(self._presence_seen.items()):
+            if seen < deadline:
+                logger.warning("No presence heartbeat from worker %s; dropping its users", worker)
+                self._on_presence({"worker": worker, "snapshot": {}})
+                del self._presence_seen[worker]
+
+    def _on_presence(self, event: dict):
+        worker = event["worker"]
+        if event.get("stopping"):
+            # Said goodbye; nothing to expire later
+            self._presence_seen.pop(worker, None)
+        elif worker != self.worker_id:
+            self._presence_seen[worker] = time.monotonic()
+        if event.get("hello"):
+            # A worker just started; tell it who is connected here
+            if worker != self.worker_id:
+                self._publish_snapshot()
+            return
+        if event.get("heartbeat"):
+            # Out of step (missed messages, or expired while it was only slow): ask for a snapshot
+            if worker != self.worker_id and len(self._presence_views.get(worker, ())) != event["online"]:
+                self._spawn(self._publish_presence({"worker": self.worker_id, "snapshot_for": worker}))
+            return
+        if "snapshot_for" in event:
+            if event["snapshot_for"] == self.worker_id:
+                self._publish_snapshot()
+            return
+        view = self._presence_views.setdefault(worker, {})
+        joined = event.get("joined", {})
+        left = event.get("left", [])
+        if "snapshot" in event:
+            joined = event["snapshot"]
+            left = [emp_id for emp_id in view if emp_id not in joined]
+        came, went = [], []
+        for emp_id in left:
+            if view.pop(emp_id, None) is None:
+                continue
+            count = self._online_counts[emp_id] - 1
+            if count:
+                self._online_counts[emp_id] = count
+            else:
+                del self._online_counts[emp_id]
+                del self.online[emp_id]
+                went.append(emp_id)
+        for emp_id, emp_name in joined.items():
+            if emp_id in view:
+                continue
+            view[emp_id] = emp_name
+            count = self._online_counts.get(emp_id, 0)
+            self._online_counts[emp_id] = count + 1
+            if not count:
+                self.online[emp_id] = emp_name
+                came.append({"emp_id": emp_id, "emp_name": emp_name})
+        if not view:
+            del self._presence_views[worker]
+        if came or went:
+            self._deliver_chat({"type": "presence", "joined": came, "left": went})
+
+    def stats(self) -> dict:
+        connections = list(self._connections())
+        return {
+            "connections": len(connections),
+            "chat_connections": len(self._chat_sockets),
+            "online": len(self.online),
+            "queue_depth": sum(conn.depth for conn in connections),
+            "peak_queue_depth": self.peak_queue_depth,
+            "enqueued": self.enqueued,
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "slow_disconnects": self.slow_disconnects,
+            "send_failures": self.send_failures,
+            "broker": self.broker.stats(),
+        }
+
+    async def start(self):
+        await self.broker.start()
+        self._presence_task = asyncio.create_task(self._presence_loop())
+        self._heartbeat_task = asyncio.create_task(self._heartbeat_loop())
+        await self.broker.publish("presence", {"worker": self.worker_id, "hello": True})
+
+    async def shutdown(self):
+        for task in (self._presence_task, self._heartbeat_task):
+            if task is not None:
+                task.cancel()
+        # Drop this worker's users from everyone else's presence
+        await self._publish_presence({"worker": self.worker_id, "snapshot": {}, "stopping": True})
+        await self.broker.stop()
+        for conn in list(self._connections()):
+            conn.close(1001)
+        if self._background:
+            await asyncio.gather(*self._background, return_exceptions=True)
+
+manager = ConnectionManager()
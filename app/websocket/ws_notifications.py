@@ -1,15 +1,20 @@
-import asyncio
 from fastapi import WebSocket, APIRouter, WebSocketDisconnect
+from .auth import authenticate
 from .manager import manager
 router = APIRouter()
 
 @router.websocket("/ws/notify/{emp_id}")
-async def websocket_notifications(websocket : WebSocket, emp_id : str):
+async def websocket_notifications(websocket : WebSocket, emp_id : str, token : str | None = None):
+    if await authenticate(websocket, emp_id, token) is None:
+        return
     await manager.connect_notification(websocket, emp_id)
     try:
+        # Notifications flow out through the manager's writer; reading here
+        # drains client pings and notices the disconnect straight away
         while True:
-            await asyncio.sleep(60)
-        
+            await websocket.receive_text()
+
     except WebSocketDisconnect:
+        pass
+    finally:
         manager.disconnect_notification(websocket, emp_id)
-
@@ -0,0 +1,196 @@
+import sys
+import os
+import argparse
+import asyncio
+import json
+import platform
+import random
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+
+# Add parent dir to path to allow importing app modules
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+DEFAULT_BASELINE = os.path.join(ROOT, "benchmarks", "baseline.json")
+SCENARIOS = ["login_burst", "employees_paged", "departments", "attendance", "leave", "chat_broadcast"]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Seed a scratch database, start the API and measure throughput and latency")
+    parser.add_argument("--database-url", help="scratch database to use (default: a new SQLite file in a temp dir)")
+    parser.add_argument("--reset", action="store_true", help="drop and recreate every table in --database-url first")
+    parser.add_argument("--employees", type=int, default=500)
+    parser.add_argument("--attendance-days", type=int, default=30)
+    parser.add_argument("--leaves", type=int, default=200, help="leave rows seeded before the run")
+    parser.add_argument("--chat-history", type=int, default=2000, help="chat messages seeded before the run")
+    parser.add_argument("--requests", type=int, default=500, help="requests per HTTP scenario")
+    parser.add_argument("--logins", type=int, default=100, help="requests in the login burst (each one is a bcrypt verify)")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--chat-clients", type=int, default=50)
+    parser.add_argument("--chat-messages", type=int, default=100, help="messages broadcast to every chat client")
+    parser.add_argument("--chat-senders", type=int, default=5)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"comma-separated subset of {','.join(SCENARIOS)}")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write this run's results as JSON")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="results file to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="relative change treated as a regression")
+    return parser.parse_args()
+
+
+def start_server(args, env) -> subprocess.Popen:
+    command = [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.port),
+               "--workers", str(args.workers), "--log-level", "warning", "--no-access-log"]
+    server = subprocess.Popen(command, cwd=ROOT, env=env)
+    import httpx
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise SystemExit(f"Server exited with code {server.returncode}")
+        try:
+            if httpx.get(f"http://127.0.0.1:{args.port}/openapi.json", timeout=1).is_success:
+                return server
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    server.terminate()
+    raise SystemExit("Server did not come up within 60s")
+
+
+async def run_scenarios(args, info, selected) -> list:
+    import httpx
+    from benchmarks import scenarios
+
+    rng = random.Random(args.seed)
+    admin = {"Authorization": f"Bearer {scenarios.employee_token(info.admin_id, 'admin', 'BENCH ADMIN')}"}
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    results = []
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", limits=limits, timeout=60) as client:
+        if "login_burst" in selected:
+            results.append(await scenarios.login_burst(client, info, args.logins, args.concurrency, rng))
+        if "employees_paged" in selected:
+            results.append(await scenarios.employees_paged(client, admin, args.requests, args.concurrency))
+        if "departments" in selected:
+            results.append(await scenarios.departments(client, admin, args.requests, args.concurrency))
+        if "attendance" in selected:
+            results.append(await scenarios.attendance(client, admin, args.requests, args.concurrency, args.attendance_days, rng))
+        if "leave" in selected:
+            results += await scenarios.leave_apply_decide(client, admin, info, args.requests, args.concurrency, rng)
+    if "chat_broadcast" in selected:
+        results.append(await scenarios.chat_broadcast(f"ws://127.0.0.1:{args.port}", info, args.chat_clients,
+                                                      args.chat_messages, args.chat_senders))
+    return results
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ""
+
+
+def print_table(summaries: dict):
+    print(f"{'scenario':<18}{'count':>8}{'errors':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'q/req':>8}")
+    for name, s in summaries.items():
+        print(f"{name:<18}{s['count']:>8}{s['errors']:>8}{s['throughput']:>10.1f}{s['p50_ms']:>10.2f}"
+              f"{s['p95_ms']:>10.2f}{s['p99_ms']:>10.2f}{s['queries_per_request']:>8.2f}")
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Print the change against `baseline` per scenario; returns the regressions beyond `tolerance`.
+
+    Throughput and p95 decide regressions; p50/p99 are informational.
+    """
+    comparable = current["params"] == baseline.get("params")
+    if not comparable:
+        print("Note: baseline was recorded with different parameters; changes are shown but not treated as regressions.")
+    regressions = []
+    print(f"\nAgainst baseline {baseline.get('revision') or '?'} ({baseline.get('recorded_at', '?')}):")
+    for name, now in current["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before:
+            print(f"  {name:<18}no baseline")
+            continue
+        changes = []
+        for key, higher_is_worse in (("throughput", False), ("p50_ms", True), ("p95_ms", True), ("p99_ms", True)):
+            if not before[key]:
+                continue
+            change = (now[key] - before[key]) / before[key]
+            changes.append(f"{key} {change:+.1%}")
+            if key in ("throughput", "p95_ms") and (change > tolerance if higher_is_worse else change < -tolerance):
+                regressions.append(f"{name} {key}: {before[key]} -> {now[key]}")
+        if now["errors"] > before["errors"]:
+            regressions.append(f"{name} errors: {before['errors']} -> {now['errors']}")
+        print(f"  {name:<18}{', '.join(changes)}")
+    return regressions if comparable else []
+
+
+def main():
+    args = parse_args()
+    selected = {name.strip() for name in args.scenarios.split(",") if name.strip()}
+    unknown = selected - set(SCENARIOS)
+    if unknown:
+        raise SystemExit(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+    workdir = tempfile.mkdtemp(prefix="ems-bench-")
+    database_url = args.database_url or f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    # The app reads its settings at import time, so they are fixed before anything from app/ is loaded
+    env = dict(os.environ, DATABASE_URL=database_url, LOG_SAMPLE_RATE="0")
+    env.setdefault("SECRET_KEY", "benchmark-secret")
+    env.setdefault("ALGORITHM", "HS256")
+    os.environ.update(env)
+
+    from app.database import engine
+    from benchmarks.seed import reset_schema, seed
+
+    rng = random.Random(args.seed)
+    reset_schema(engine, args.reset or not args.database_url)
+    info = seed(engine, args.employees, args.attendance_days, args.leaves, args.chat_history, rng)
+    engine.dispose()
+    print(f"Seeded {args.employees} employees into {database_url} in {info.seconds:.1f}s")
+
+    server = start_server(args, env)
+    try:
+        results = asyncio.run(run_scenarios(args, info, selected))
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+    current = {
+        "revision": git_revision(),
+        "recorded_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "database": database_url.split(":", 1)[0],
+        "params": {key: getattr(args, key) for key in (
+            "employees", "attendance_days", "leaves", "chat_history", "requests", "logins", "concurrency",
+            "chat_clients", "chat_messages", "chat_senders", "workers")},
+        "scenarios": {result.name: result.summary() for result in results},
+    }
+    print()
+    print_table(current["scenarios"])
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(current, f, indent=2)
+    regressions = []
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            regressions = compare(current, json.load(f), args.tolerance)
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(current, f, indent=2)
+        print(f"\nBaseline saved to {args.baseline}")
+    if regressions:
+        print("\nRegressions beyond tolerance:")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
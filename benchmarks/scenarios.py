@@ -0,0 +1,193 @@
+import asyncio
+import json
+import random
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Awaitable, Callable
+import httpx
+import websockets
+from app.security import create_access_token
+from .seed import SeedInfo
+
+# Leave dates the scenario may use; seeded leaves start 30 days out so the two never collide
+LEAVE_WINDOW_DAYS = 29
+
+
+def percentile(ordered: list[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, round(q / 100 * len(ordered)) - 1))]
+
+
+@dataclass
+class ScenarioResult:
+    name: str
+    latencies: list[float] = field(default_factory=list)
+    errors: int = 0
+    seconds: float = 0.0
+    # Sum of X-DB-Query-Count over the responses that carried it
+    queries: int = 0
+
+    def summary(self) -> dict:
+        ordered = sorted(self.latencies)
+        count = len(ordered)
+        return {
+            "count": count,
+            "errors": self.errors,
+            "throughput": round(count / self.seconds, 1) if self.seconds else 0.0,
+            "p50_ms": round(percentile(ordered, 50) * 1000, 2),
+            "p95_ms": round(percentile(ordered, 95) * 1000, 2),
+            "p99_ms": round(percentile(ordered, 99) * 1000, 2),
+            "queries_per_request": round(self.queries / count, 2) if count else 0.0,
+        }
+
+
+def employee_token(emp_id: str, role: str = "employee", name: str = "") -> str:
+    # Minted locally with the server's SECRET_KEY; logging everyone in would just benchmark bcrypt
+    return create_access_token(data={"sub": emp_id, "role": role, "name": name or emp_id})
+
+
+async def run_requests(name: str, count: int, concurrency: int, request: Callable[[int], Awaitable[httpx.Response]]) -> ScenarioResult:
+    """Issue `count` requests from `concurrency` workers; non-2xx responses and exceptions count as errors."""
+    result = ScenarioResult(name)
+    next_index = iter(range(count))
+
+    async def worker():
+        for index in next_index:
+            start = time.perf_counter()
+            try:
+                response = await request(index)
+            except httpx.HTTPError:
+                result.errors += 1
+                continue
+            elapsed = time.perf_counter() - start
+            if response.is_success:
+                result.latencies.append(elapsed)
+                result.queries += int(response.headers.get("x-db-query-count", 0))
+            else:
+                result.errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(max(1, min(concurrency, count)))))
+    result.seconds = time.perf_counter() - start
+    return result
+
+
+async def login_burst(client: httpx.AsyncClient, info: SeedInfo, count: int, concurrency: int, rng: random.Random) -> ScenarioResult:
+    return await run_requests("login_burst", count, concurrency, lambda _: client.post(
+        "/employee/login", json={"emp_id": rng.choice(info.employee_ids), "password": info.password}
+    ))
+
+
+async def employees_paged(client: httpx.AsyncClient, admin: dict, count: int, concurrency: int, page_size: int = 20) -> ScenarioResult:
+    """Every worker walks /admin/employees page by page with the keyset cursor, starting over at the end."""
+    cursors = deque([None] * concurrency)
+
+    async def request(_):
+        cursor = cursors.popleft()
+        params = {"limit": page_size, **({"cursor": cursor} if cursor else {})}
+        try:
+            response = await client.get("/admin/employees", params=params, headers=admin)
+        except httpx.HTTPError:
+            cursors.append(None)
+            raise
+        cursors.append(response.json().get("next_cursor") if response.is_success else None)
+        return response
+
+    return await run_requests("employees_paged", count, concurrency, request)
+
+
+async def departments(client: httpx.AsyncClient, admin: dict, count: int, concurrency: int) -> ScenarioResult:
+    return await run_requests("departments", count, concurrency, lambda _: client.get("/admin/departments", headers=admin))
+
+
+async def attendance(client: httpx.AsyncClient, admin: dict, count: int, concurrency: int, days: int, rng: random.Random) -> ScenarioResult:
+    return await run_requests("attendance", count, concurrency, lambda _: client.get(
+        "/admin/attendance", params={"date": str(date.today() - timedelta(days=rng.randrange(max(1, days))))}, headers=admin
+    ))
+
+
+async def leave_apply_decide(client: httpx.AsyncClient, admin: dict, info: SeedInfo, count: int, concurrency: int,
+                             rng: random.Random) -> list[ScenarioResult]:
+    """Employees apply for leave (admins get notified), then the admin accepts or rejects each request."""
+    count = min(count, len(info.employee_ids) * LEAVE_WINDOW_DAYS)
+    tokens = {}
+    leave_ids = []
+
+    async def apply(index: int):
+        emp_id = info.employee_ids[index % len(info.employee_ids)]
+        if emp_id not in tokens:
+            tokens[emp_id] = {"Authorization": f"Bearer {employee_token(emp_id)}"}
+        leave_date = date.today() + timedelta(days=1 + index // len(info.employee_ids))
+        response = await client.post("/employee/leave", json={"leave_date": str(leave_date), "reason": "benchmark"}, headers=tokens[emp_id])
+        if response.is_success:
+            leave_ids.append(response.json()["id"])
+        return response
+
+    applied = await run_requests("leave_apply", count, concurrency, apply)
+    decided = await run_requests("leave_decide", len(leave_ids), concurrency, lambda index: client.patch(
+        f"/admin/leave/{leave_ids[index]}", json={"decision": rng.choice(["ACCEPTED", "REJECTED"])}, headers=admin
+    ))
+    return [applied, decided]
+
+
+async def chat_broadcast(ws_url: str, info: SeedInfo, clients: int, messages: int, senders: int, timeout: float = 60.0) -> ScenarioResult:
+    """Fan-out latency: `clients` sockets join the global chat and every message is timed until each socket has it.
+
+    Latencies are per delivery (send on one socket to receipt on another); throughput is deliveries per second.
+    Deliveries that never arrive, including those to sockets that failed to connect, count as errors.
+    """
+    result = ScenarioResult("chat_broadcast")
+    sent_at: dict[str, float] = {}
+    expected = 0
+    delivered = 0
+    done = asyncio.Event()
+
+    async def receive(socket):
+        nonlocal delivered
+        async for frame in socket:
+            payload = json.loads(frame)
+            sent = sent_at.get(payload.get("message", "")) if payload.get("type") == "Global_chat" else None
+            if sent is None:
+                continue
+            result.latencies.append(time.perf_counter() - sent)
+            delivered += 1
+            if delivered >= expected:
+                done.set()
+
+    sockets = []
+    try:
+        for emp_id in info.employee_ids[:clients]:
+            url = f"{ws_url}/ws/chat/global?emp_id={emp_id}&token={employee_token(emp_id)}"
+            try:
+                sockets.append(await websockets.connect(url, max_queue=None, open_timeout=10))
+            except (OSError, asyncio.TimeoutError, websockets.WebSocketException):
+                result.errors += messages
+        if not sockets:
+            return result
+        expected = len(sockets) * messages
+        senders = max(1, min(senders, len(sockets)))
+        readers = [asyncio.create_task(receive(socket)) for socket in sockets]
+        start = time.perf_counter()
+
+        async def send(sender: int):
+            for seq in range(sender, messages, senders):
+                text = f"bench {seq}"
+                sent_at[text] = time.perf_counter()
+                await sockets[sender].send(json.dumps({"message": text}))
+
+        await asyncio.gather(*(send(sender) for sender in range(senders)))
+        try:
+            await asyncio.wait_for(done.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        result.seconds = time.perf_counter() - start
+        result.errors += expected - delivered
+        for reader in readers:
+            reader.cancel()
+    finally:
+        await asyncio.gather(*(socket.close() for socket in sockets), return_exceptions=True)
+    return result
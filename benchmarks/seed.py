@@ -0,0 +1,90 @@
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+import random
+from sqlalchemy import func, insert, select
+from sqlalchemy.engine import Engine
+from app.database import Base
+from app.crud import format_emp_id
+from app.models import Attendance, AttendanceStatus, ChatMessage, Department, Employee, Leave
+from app.security import get_password_hash
+
+PASSWORD = "bench-pw"
+DEPARTMENTS = ["ENGINEERING", "SALES", "FINANCE", "SUPPORT", "HR", "OPERATIONS", "LEGAL", "MARKETING"]
+
+
+@dataclass
+class SeedInfo:
+    admin_id: str
+    employee_ids: list[str] = field(default_factory=list)
+    password: str = PASSWORD
+    seconds: float = 0.0
+
+
+def reset_schema(engine: Engine, drop: bool):
+    """Create the tables; with `drop`, start from empty ones. Refuses to seed over existing employees."""
+    if drop:
+        Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    with engine.connect() as conn:
+        existing = conn.scalar(select(func.count()).select_from(Employee))
+    if existing:
+        raise SystemExit(f"Database already holds {existing} employees; point --database-url at a scratch database or pass --reset")
+
+
+def seed(engine: Engine, employees: int, attendance_days: int, leaves: int, chat_messages: int, rng: random.Random) -> SeedInfo:
+    """Insert one admin, `employees` employees and their history with multi-row INSERTs.
+
+    Everyone shares one password so bcrypt runs once instead of once per row.
+    """
+    start = datetime.now()
+    password = get_password_hash(PASSWORD)
+    admin_id = format_emp_id("bench", "admin", 1)
+    rows = [{"emp_id": admin_id, "name": "BENCH ADMIN", "age": 45, "dept": DEPARTMENTS[0], "salary": 150000, "password": password, "role": "admin"}]
+    for number in range(1, employees + 1):
+        name = f"employee {number}"
+        rows.append({
+            "emp_id": format_emp_id("emp", "employee", number),
+            "name": name.upper(),
+            "age": rng.randint(21, 64),
+            "dept": rng.choice(DEPARTMENTS),
+            "salary": rng.randint(30, 200) * 1000,
+            "password": password,
+            "role": "employee",
+        })
+    info = SeedInfo(admin_id=admin_id, employee_ids=[row["emp_id"] for row in rows[1:]])
+
+    today = date.today()
+    statuses = [AttendanceStatus.PRESENT] * 8 + [AttendanceStatus.ABSENT, AttendanceStatus.LEAVE]
+    with engine.begin() as conn:
+        conn.execute(insert(Department), [{"name": name} for name in DEPARTMENTS])
+        conn.execute(insert(Employee), rows)
+        for day in range(attendance_days):
+            on = today - timedelta(days=day)
+            conn.execute(insert(Attendance), [
+                {"emp_id": emp_id, "date": on, "status": rng.choice(statuses)} for emp_id in info.employee_ids
+            ])
+        if leaves:
+            conn.execute(insert(Leave), [
+                {
+                    "emp_id": rng.choice(info.employee_ids),
+                    "leave_date": today + timedelta(days=rng.randint(30, 365)),
+                    "reason": "seeded",
+                    "status": rng.choice(["PENDING", "ACCEPTED", "REJECTED"]),
+                    "applied_at": datetime.utcnow(),
+                }
+                for _ in range(leaves)
+            ])
+        if chat_messages:
+            senders = rng.sample(rows, min(len(rows), 50))
+            conn.execute(insert(ChatMessage), [
+                {
+                    "emp_id": sender["emp_id"],
+                    "emp_name": sender["name"],
+                    "message": f"seeded message {n}",
+                    "created_at": datetime.utcnow() - timedelta(seconds=chat_messages - n),
+                    "is_deleted": False,
+                }
+                for n, sender in ((n, rng.choice(senders)) for n in range(chat_messages))
+            ])
+    info.seconds = (datetime.now() - start).total_seconds()
+    return info
@@ -46,21 +46,35 @@ async function adminLogin() {
   }
 }
 
+let searchController = null;
+
 async function loadEmployees(query = "") {
-  let url = '/admin/employees?limit=100';
-  if (query) url += `&name=${query}`;
+  // Drop any in-flight search so a slow response can't overwrite a newer one
+  if (searchController) searchController.abort();
+  searchController = new AbortController();
+
+  const url = query
+    ? `/admin/employees/search?q=${encodeURIComponent(query)}&limit=100`
+    : '/admin/employees?limit=100';
 
-  const res = await apiRequest(url);
-  const data = await res.json();
+  let employees;
+  try {
+    const res = await apiRequest(url, { signal: searchController.signal });
+    const data = await res.json();
+    employees = query ? data : data.list_of_employees;
+  } catch (err) {
+    if (err.name === 'AbortError') return;
+    throw err;
+  }
   const container = document.getElementById("employees");
   container.innerHTML = "";
 
-  if (data.list_of_employees.length === 0) {
+  if (employees.length === 0) {
     container.innerHTML = '<div class="text-center p-4 text-muted">No employees found</div>';
     return;
   }
 
-  data.list_of_employees.forEach(emp => {
+  employees.forEach(emp => {
     const div = document.createElement("div");
     div.className = "d-flex justify-content-between align-items-center p-3 border-bottom border-secondary";
     div.style.cursor = "pointer";
@@ -88,7 +102,7 @@ function searchEmployees() {
   searchTimeout = setTimeout(() => {
     const query = document.getElementById('employeeSearch').value;
     loadEmployees(query);
-  }, 300);
+  }, 150);
 }
 
 async function createEmployee() {
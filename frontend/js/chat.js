@@ -8,6 +8,7 @@ class GlobalChatManager {
         this.empName = null;
         this.messages = [];
         this.loadedMessageIds = new Set(); // Track loaded message IDs to prevent duplicates
+        this.lastSeenId = 0; // Newest message id shown; sent on reconnect to catch up
         this.isConnected = false;
         this.reconnectAttempts = 0;
         this.maxReconnectAttempts = 5;
@@ -52,7 +53,14 @@ class GlobalChatManager {
         if (this.isConnected || !this.empId) return;
 
         try {
-            const wsUrl = API_BASE_URL.replace('http', 'ws') + `/ws/chat/global?emp_id=${this.empId}`;
+            let wsUrl = API_BASE_URL.replace('http', 'ws') + `/ws/chat/global?emp_id=${this.empId}`;
+            const token = sessionStorage.getItem('token');
+            if (token) {
+                wsUrl += `&token=${encodeURIComponent(token)}`;
+            }
+            if (this.lastSeenId) {
+                wsUrl += `&last_seen_id=${this.lastSeenId}`;
+            }
             this.ws = new WebSocket(wsUrl);
 
             this.ws.onopen = () => {
@@ -61,8 +69,11 @@ class GlobalChatManager {
                 this.reconnectAttempts = 0;
                 this.showConnectionStatus('Connected', 'success');
 
-                // Load chat history when connection is established
-                this.loadChatHistory();
+                // On a reconnect the server replays what we missed in a "sync" frame;
+                // only a fresh connection needs the full history
+                if (!this.lastSeenId) {
+                    this.loadChatHistory();
+                }
             };
 
             this.ws.onmessage = (event) => {
@@ -131,6 +142,7 @@ class GlobalChatManager {
             // Clear container and reset loaded IDs
             messagesContainer.innerHTML = '';
             this.loadedMessageIds.clear();
+            this.lastSeenId = 0;
 
             if (messages.length === 0) {
                 messagesContainer.innerHTML = `
@@ -162,7 +174,39 @@ class GlobalChatManager {
     handleMessage(data) {
         if (data.type === 'Global_chat') {
             this.addMessage(data);
+        } else if (data.type === 'chat_edit') {
+            this.editMessage(data);
+        } else if (data.type === 'chat_delete') {
+            this.removeMessage(data.id);
+        } else if (data.type === 'sync') {
+            this.applySync(data);
+        }
+    }
+
+    applySync(data) {
+        if (data.reset) {
+            // Too far behind for the server's log; start over from history
+            this.loadChatHistory();
+            return;
         }
+        data.messages.forEach(msg => this.addMessage(msg));
+        data.edits.forEach(edit => this.editMessage(edit));
+        data.deleted.forEach(id => this.removeMessage(id));
+    }
+
+    findMessageElement(id) {
+        return document.querySelector(`#chat-messages .chat-message[data-id="${id}"]`);
+    }
+
+    editMessage(data) {
+        const content = this.findMessageElement(data.id)?.querySelector('.chat-message-content');
+        if (content) {
+            content.textContent = data.message;
+        }
+    }
+
+    removeMessage(id) {
+        this.findMessageElement(id)?.remove();
     }
 
     addMessage(messageData) {
@@ -178,10 +222,14 @@ class GlobalChatManager {
         // Track this message ID
         if (messageData.id) {
             this.loadedMessageIds.add(messageData.id);
+            this.lastSeenId = Math.max(this.lastSeenId, messageData.id);
         }
 
         const messageDiv = document.createElement('div');
         messageDiv.className = `chat-message ${messageData.emp_id === this.empId ? 'own' : 'other'}`;
+        if (messageData.id) {
+            messageDiv.dataset.id = messageData.id;
+        }
 
         const headerDiv = document.createElement('div');
         headerDiv.className = 'chat-message-header';
@@ -7,11 +7,15 @@ async function loadNotifications() {
     if (!notifyBadge || !notifyList) return;
 
     try {
-        const res = await apiRequest('/notifications');
-        if (!res.ok) throw new Error("Failed to fetch notifications");
+        // The dropdown shows the newest 10; the badge needs only the unread count
+        const [res, countRes] = await Promise.all([
+            apiRequest('/notifications?limit=10'),
+            apiRequest('/notifications/unread-count')
+        ]);
+        if (!res.ok || !countRes.ok) throw new Error("Failed to fetch notifications");
 
-        const notifications = await res.json();
-        const unreadCount = notifications.filter(n => !n.is_read).length;
+        const { notifications } = await res.json();
+        const unreadCount = (await countRes.json()).unread_notifications;
 
         if (unreadCount > 0) {
             notifyBadge.textContent = unreadCount;
@@ -33,7 +37,7 @@ async function loadNotifications() {
             <li><hr class="dropdown-divider"></li>
         `;
 
-        notifications.slice(0, 10).forEach(n => {
+        notifications.forEach(n => {
             const date = new Date(n.created_at).toLocaleString();
             const li = document.createElement('li');
             li.className = `dropdown-item position-relative ${n.is_read ? 'opacity-75' : 'fw-bold'}`;
@@ -142,7 +146,7 @@ function initWebSocket() {
     }
 
     try {
-        wsConnection = new WebSocket(`${WS_BASE}/ws/notify/${emp_id}`);
+        wsConnection = new WebSocket(`${WS_BASE}/ws/notify/${emp_id}?token=${encodeURIComponent(token)}`);
 
         wsConnection.onopen = () => {
             console.log("WebSocket connected for employee:", emp_id);
@@ -0,0 +1,44 @@
+import sys
+import os
+import argparse
+import asyncio
+
+# Add parent dir to path to allow importing app modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import SessionLocal
+from app.retention import POLICIES, RETENTION_BATCH_SIZE, announce_chat_archived, archive_old_rows, count_due
+from app.websocket.broker import WS_BROKER
+
+def report_due(names):
+    db = SessionLocal()
+    try:
+        for name in names:
+            print(f"{name}: {count_due(db, POLICIES[name])} rows due for archiving")
+    finally:
+        db.close()
+
+def archive(names, batch_size):
+    print(f"Archiving {', '.join(names)} in batches of {batch_size}...")
+    report = archive_old_rows(names, batch_size)
+    for name, moved in report.moved.items():
+        print(f"  {name}: moved {moved} rows")
+    print(f"Took {report.seconds:.2f}s over {report.batches} batches.")
+    if report.moved.get("chat"):
+        if WS_BROKER == "memory":
+            print("Running workers show the archived chat messages until their history reload (CHAT_HISTORY_TTL_SECONDS).")
+        else:
+            asyncio.run(announce_chat_archived(report.moved["chat"]))
+            print("Told running workers to reload their chat history.")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move old read notifications and deleted chat messages to the archive tables")
+    parser.add_argument("--table", choices=[*POLICIES, "all"], default="all")
+    parser.add_argument("--batch-size", type=int, default=RETENTION_BATCH_SIZE)
+    parser.add_argument("--dry-run", action="store_true", help="only count the rows that would be moved")
+    args = parser.parse_args()
+    names = list(POLICIES) if args.table == "all" else [args.table]
+    if args.dry_run:
+        report_due(names)
+    else:
+        archive(names, args.batch_size)
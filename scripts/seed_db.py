@@ -1,6 +1,7 @@
 import sys
 import os
 import csv
+import argparse
 import random # Kept in case we need it, though mostly replacing with CSV data
 
 # Add parent dir to path to allow importing app modules
@@ -9,6 +10,8 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from sqlalchemy.orm import Session
 from app.database import SessionLocal, engine, Base
 from app import crud, schemas, models
+from app.bulk_import import BULK_IMPORT_BATCH_SIZE, bulk_import_employees, read_csv_rows
+from app.security import PasswordHasher
 
 # CSV File Path
 CSV_FILE_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "employees.csv")
@@ -105,5 +108,46 @@ def seed_employees_from_csv():
     finally:
         db.close()
 
+def bulk_seed_employees_from_csv(batch_size, workers):
+    if not os.path.exists(CSV_FILE_PATH):
+        print(f"Error: CSV file not found at {CSV_FILE_PATH}")
+        return
+
+    # Spread bcrypt across every core for the duration of the import
+    hasher = PasswordHasher(workers, mode="process")
+    db = SessionLocal()
+    try:
+        print(f"Bulk importing from {CSV_FILE_PATH} (batch size {batch_size}, {workers} hash workers)...")
+        with open(CSV_FILE_PATH, mode='r', encoding='utf-8', newline='') as csvfile:
+            report = bulk_import_employees(db, read_csv_rows(csvfile), batch_size=batch_size, hasher=hasher, create_departments=True)
+
+        file_exists = os.path.exists(CREDENTIALS_FILE_PATH) and os.path.getsize(CREDENTIALS_FILE_PATH) > 0
+        with open(CREDENTIALS_FILE_PATH, "a") as f:
+            if not file_exists:
+                f.write("EMP_ID | PASSWORD | ROLE | DEPT\n")
+                f.write("-" * 40 + "\n")
+            for cred in report.credentials:
+                f.write(f"{cred['emp_id']} | {cred['password']} | {cred['role']} | {cred['dept']}\n")
+
+        for error in report.errors:
+            print(f"  Error: {error}")
+        print(f"Created {report.created} employees, skipped {report.skipped} existing, {len(report.errors)} errors.")
+        print(f"Took {report.seconds:.2f}s ({report.rows_per_second:.0f} rows/s).")
+        print(f"Credentials appended to {CREDENTIALS_FILE_PATH}")
+    except Exception as e:
+        print(f"Error: {e}")
+        db.rollback()
+    finally:
+        db.close()
+        hasher.shutdown()
+
 if __name__ == "__main__":
-    seed_employees_from_csv()
+    parser = argparse.ArgumentParser(description="Seed employees from data/employees.csv")
+    parser.add_argument("--bulk", action="store_true", help="batched import with parallel password hashing")
+    parser.add_argument("--batch-size", type=int, default=BULK_IMPORT_BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="password hashing processes (--bulk only)")
+    args = parser.parse_args()
+    if args.bulk:
+        bulk_seed_employees_from_csv(args.batch_size, args.workers)
+    else:
+        seed_employees_from_csv()